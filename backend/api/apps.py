@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        import api.signals  # noqa: F401
+        from django.db.backends.signals import connection_created
+
+        from api.metrics import instrument_connection
+
+        connection_created.connect(instrument_connection)
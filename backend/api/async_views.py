@@ -0,0 +1,136 @@
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+from django.http import HttpResponseNotAllowed, JsonResponse
+from django.urls import URLPattern
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+
+from api.ingredient_index import ingredient_index
+from api.short_links import (
+    INVALID_SHORT_LINK,
+    RECIPE_NOT_FOUND,
+    decode_short_link,
+    recipe_links,
+    short_link_redirect,
+)
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+# Параметры json.dumps, дающие тот же вывод, что и JSONRenderer DRF.
+JSON_DUMPS_PARAMS = {'ensure_ascii': False, 'separators': (',', ':')}
+
+
+def in_pool(func):
+    """Выполняет синхронную функцию в общем пуле потоков.
+
+    Под ASGI Django выполняет синхронный код в одном потоке на процесс,
+    и медленный запрос задерживает остальные. Здесь вызовы идут
+    параллельно, а соединение с БД потока закрывается так же, как в конце
+    обычного запроса.
+    """
+
+    def run(*args, **kwargs):
+        close_old_connections()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+
+    return sync_to_async(run, thread_sensitive=False)
+
+
+def run_in_pool(view):
+    """Выполняет представление в пуле потоков и там же отрисовывает ответ."""
+
+    def run(request, *args, **kwargs):
+        response = view(request, *args, **kwargs)
+        if callable(getattr(response, 'render', None)):
+            response.render()
+        return response
+
+    return in_pool(run)
+
+
+def async_read_view(view):
+    """Асинхронная обёртка над представлением DRF для горячих чтений.
+
+    Безопасные запросы выполняются в пуле потоков, изменяющие — как
+    обычно в Django, в общем синхронном потоке.
+    """
+    read = run_in_pool(view)
+    write = sync_to_async(view, thread_sensitive=True)
+
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        handler = read if request.method in SAFE_METHODS else write
+        return await handler(request, *args, **kwargs)
+    return wrapper
+
+
+def async_ingredient_list(view):
+    """Поиск ингредиентов по индексу в памяти прямо в цикле событий.
+
+    Условные запросы обрабатываются с тем же ETag, что и у
+    IngredientsViewSet.
+    """
+    fallback = async_read_view(view)
+
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        name = request.GET.get('name')
+        if request.method == 'GET' and name:
+            etag = ingredient_index.etag(request, load=False)
+            rows = ingredient_index.search(name, load=False)
+            if etag is not None and rows is not None:
+                etag = quote_etag(etag)
+                response = get_conditional_response(request, etag=etag)
+                if response is None:
+                    response = JsonResponse(
+                        rows, safe=False, json_dumps_params=JSON_DUMPS_PARAMS
+                    )
+                response['ETag'] = etag
+                return response
+        return await fallback(request, *args, **kwargs)
+    return wrapper
+
+
+async def short_link(request, encoded_id):
+    if request.method not in ('GET', 'HEAD'):
+        return HttpResponseNotAllowed(('GET', 'HEAD'))
+    recipe_id = decode_short_link(encoded_id)
+    if recipe_id is None:
+        return JsonResponse(
+            {'error': INVALID_SHORT_LINK}, status=400,
+            json_dumps_params=JSON_DUMPS_PARAMS
+        )
+    if (
+        recipe_id not in recipe_links
+        and not await in_pool(recipe_links.exists)(recipe_id)
+    ):
+        return JsonResponse(
+            {'detail': RECIPE_NOT_FOUND}, status=404,
+            json_dumps_params=JSON_DUMPS_PARAMS
+        )
+    return short_link_redirect(recipe_id)
+
+
+# Как и у ShortLinkView: без проверки CSRF, на запись отвечает 405.
+short_link.csrf_exempt = True
+
+ASYNC_ROUTES = {
+    'recipe-list': async_read_view,
+    'recipe-detail': async_read_view,
+    'ingredient-list': async_ingredient_list,
+}
+
+
+def asyncify_routes(patterns):
+    """Подменяет представления маршрутов роутера на асинхронные."""
+    return [
+        URLPattern(
+            pattern.pattern, ASYNC_ROUTES[pattern.name](pattern.callback),
+            pattern.default_args, pattern.name
+        ) if getattr(pattern, 'name', None) in ASYNC_ROUTES else pattern
+        for pattern in patterns
+    ]
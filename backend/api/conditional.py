@@ -0,0 +1,61 @@
+import hashlib
+from functools import wraps
+
+from django.utils.cache import patch_vary_headers
+from django.views.decorators.http import condition
+
+from recipes.models import Version
+
+
+def conditional(*keys, per_user=False):
+    """Условный GET по версиям данных: ETag и Last-Modified.
+
+    keys — ключи Version, от которых зависит ответ; per_user добавляет
+    ключ текущего пользователя. Версии читаются одним запросом, при
+    совпадении валидаторов возвращается 304 без сериализации.
+    """
+
+    def get_versions(request):
+        versions = getattr(request, 'data_versions', None)
+        if versions is None:
+            version_keys = list(keys)
+            if per_user and request.user.is_authenticated:
+                version_keys.append(f'user:{request.user.pk}')
+            versions = dict.fromkeys(version_keys, (0, None))
+            versions.update(
+                (key, (version, updated_at))
+                for key, version, updated_at in Version.objects.filter(
+                    key__in=version_keys
+                ).values_list('key', 'version', 'updated_at')
+            )
+            request.data_versions = versions
+        return versions
+
+    def etag(request, *args, **kwargs):
+        state = '|'.join((
+            request.get_full_path(),
+            request.META.get('HTTP_ACCEPT', ''),
+            str(request.user.pk),
+            *(f'{key}:{version}' for key, (version, _)
+              in sorted(get_versions(request).items())),
+        ))
+        return hashlib.md5(state.encode()).hexdigest()
+
+    def last_modified(request, *args, **kwargs):
+        return max(
+            (updated_at for _, updated_at in get_versions(request).values()
+             if updated_at),
+            default=None
+        )
+
+    def decorator(view):
+        conditional_view = condition(etag, last_modified)(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = conditional_view(request, *args, **kwargs)
+            if per_user:
+                patch_vary_headers(response, ('Authorization',))
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,25 @@
+from contextvars import ContextVar
+
+REPLICA = 'replica'
+
+# Псевдоним базы для чтения в текущем запросе; None — основная база.
+read_database = ContextVar('read_database', default=None)
+
+
+class PrimaryReplicaRouter:
+    """Чтение на реплику, если его разрешил ReplicaRoutingMiddleware.
+
+    Запись, миграции и всё вне запросов к API идут в основную базу.
+    """
+
+    def db_for_read(self, model, **hints):
+        return read_database.get()
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
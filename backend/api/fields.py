@@ -1,14 +1,115 @@
-from django.core.files.base import ContentFile
 import base64
+import binascii
+import hashlib
+
+from django.conf import settings
+from django.core.files.uploadedfile import TemporaryUploadedFile
 from rest_framework import serializers
 
+# Сигнатуры поддерживаемых форматов в начале файла.
+IMAGE_SIGNATURES = (
+    (b'\x89PNG\r\n\x1a\n', 'png'),
+    (b'\xff\xd8\xff', 'jpg'),
+    (b'GIF87a', 'gif'),
+    (b'GIF89a', 'gif'),
+)
+# Столько байт достаточно, чтобы узнать любой формат из IMAGE_SIGNATURES
+# и WebP.
+SIGNATURE_SIZE = 12
+# Количество символов base64, декодируемых за один раз (кратно 4).
+CHUNK_SIZE = 64 * 1024
+
+
+def sniff_image_extension(header):
+    """Определяет расширение изображения по первым байтам."""
+    if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+        return 'webp'
+    for signature, extension in IMAGE_SIGNATURES:
+        if header.startswith(signature):
+            return extension
+    return None
+
 
 class Base64ImageField(serializers.ImageField):
-    """Сериализатор для картинок"""
+    """Сериализатор для картинок.
+
+    Декодирует base64 по частям во временный файл, ограничивая размер
+    BASE64_IMAGE_MAX_SIZE, определяет формат по содержимому и называет
+    файл хешем содержимого, чтобы одинаковые картинки хранились один раз.
+    """
+
+    default_error_messages = {
+        'max_size': 'Размер изображения не должен превышать {max_size} байт.',
+    }
+
     def to_internal_value(self, data):
         if isinstance(data, str) and data.startswith('data:image'):
-            format, imgstr = data.split(';base64,')
-            ext = format.split('/')[-1]
-            data = ContentFile(base64.b64decode(imgstr), name='temp.' + ext)
+            data = self.decode(data)
 
         return super().to_internal_value(data)
+
+    def decode(self, data):
+        # Начало base64 ищется без partition, чтобы не копировать
+        # содержимое строки целиком.
+        separator = data.find(';base64,')
+        if separator < 0:
+            self.fail('invalid_image')
+        max_size = settings.BASE64_IMAGE_MAX_SIZE
+
+        file = TemporaryUploadedFile('temp', None, 0, None)
+        try:
+            extension, digest, size = self.write_chunks(
+                data, separator + len(';base64,'), file, max_size
+            )
+        except Exception:
+            file.close()
+            raise
+        file.seek(0)
+        file.size = size
+        file.name = f'{digest}.{extension}'
+        file.content_type = f'image/{extension}'
+        return file
+
+    def decode_chunks(self, data, start):
+        """Декодирует data[start:] частями по CHUNK_SIZE символов.
+
+        Пробелы и переносы строк (base64 в формате MIME) отбрасываются,
+        символы сверх кратного 4 переносятся в следующую часть.
+        """
+        rest = ''
+        for position in range(start, len(data), CHUNK_SIZE):
+            text = rest + ''.join(data[position:position + CHUNK_SIZE].split())
+            end = len(text) // 4 * 4
+            text, rest = text[:end], text[end:]
+            try:
+                yield base64.b64decode(text, validate=True)
+            except (binascii.Error, ValueError):
+                self.fail('invalid_image')
+        if rest:
+            self.fail('invalid_image')
+
+    def write_chunks(self, data, start, file, max_size):
+        digest = hashlib.sha256()
+        extension = None
+        # Первые байты файла, по которым определяется формат.
+        header = b''
+        size = 0
+        for chunk in self.decode_chunks(data, start):
+            size += len(chunk)
+            if size > max_size:
+                self.fail('max_size', max_size=max_size)
+            if extension is None and len(header) < SIGNATURE_SIZE:
+                header = (header + chunk)[:SIGNATURE_SIZE]
+                if len(header) == SIGNATURE_SIZE:
+                    extension = self.sniff(header)
+            digest.update(chunk)
+            file.write(chunk)
+        if extension is None:
+            extension = self.sniff(header)
+        return extension, digest.hexdigest(), size
+
+    def sniff(self, header):
+        extension = sniff_image_extension(header)
+        if extension is None:
+            self.fail('invalid_image')
+        return extension
@@ -1,12 +1,17 @@
 from django_filters.rest_framework import FilterSet, filters
+from rest_framework.filters import SearchFilter
 
-from recipes.models import Recipe, Tag
+from api.tag_registry import tag_registry
+from recipes.models import Recipe
+
+
+def tag_choices():
+    return tag_registry.choices()
 
 
 class RecipeFilter(FilterSet):
-    tags = filters.ModelMultipleChoiceFilter(
-        field_name='tags__slug', to_field_name='slug',
-        queryset=Tag.objects.all()
+    tags = filters.MultipleChoiceFilter(
+        choices=tag_choices, method='filter_tags'
     )
     is_favorited = filters.BooleanFilter(method='filter_is_favorited')
     is_in_shopping_cart = filters.BooleanFilter(
@@ -16,6 +21,12 @@ class RecipeFilter(FilterSet):
         model = Recipe
         fields = ('tags', 'author')
 
+    def filter_tags(self, queryset, name, value):
+        """Слаги переводятся в id по каталогу, без запроса к таблице тегов."""
+        return queryset.filter(id__in=Recipe.tags.through.objects.filter(
+            tag_id__in=tag_registry.ids_for(value)
+        ).values('recipe_id'))
+
     def filter_is_favorited(self, queryset, name, value):
         if value and self.request.user.is_authenticated:
             return queryset.filter(favorites__user=self.request.user)
@@ -25,3 +36,13 @@ class RecipeFilter(FilterSet):
         if value and self.request.user.is_authenticated:
             return queryset.filter(shopping_cart__user=self.request.user)
         return queryset
+
+
+class RecipeSearchFilter(SearchFilter):
+    """Ранжированный поиск по названию и описанию рецепта."""
+
+    def filter_queryset(self, request, queryset, view):
+        query = ' '.join(self.get_search_terms(request))
+        if not query:
+            return queryset
+        return queryset.search(query)
@@ -0,0 +1,78 @@
+import hashlib
+import json
+from bisect import bisect_left
+
+from api.process_cache import ProcessCache
+from recipes.models import Ingredient
+
+# Верхняя граница для поиска по префиксу: больше любого символа в названии.
+PREFIX_END = '\U0010ffff'
+
+
+def fold(value):
+    """Приводит строку к виду для сравнения без учёта регистра и ё/е."""
+    return value.casefold().replace('ё', 'е')
+
+
+class IngredientIndex(ProcessCache):
+    """Отсортированный индекс ингредиентов в памяти процесса.
+
+    Отвечает на поиск по началу названия без обращения к базе данных.
+    """
+
+    ttl_setting = 'INGREDIENT_INDEX_TTL'
+
+    def load(self):
+        ingredients = sorted(
+            (
+                (fold(name), pk, name, unit) for pk, name, unit in
+                Ingredient.objects.values_list(
+                    'id', 'name', 'measurement_unit'
+                ).iterator()
+            ),
+            key=lambda item: (item[0], item[1])
+        )
+        rows = [
+            {'id': pk, 'name': name, 'measurement_unit': unit}
+            for _, pk, name, unit in ingredients
+        ]
+        keys = [key for key, *_ in ingredients]
+        etag = hashlib.md5(
+            json.dumps(rows, ensure_ascii=False).encode()
+        ).hexdigest()
+        return keys, rows, etag
+
+    def search(self, prefix, load=True):
+        """Возвращает ингредиенты, название которых начинается с prefix.
+
+        С load=False не загружает индекс, а возвращает None, если его
+        ещё нет в памяти.
+        """
+        data = self.get() if load else self.peek()
+        if data is None:
+            return None
+        keys, rows, _ = data
+        prefix = fold(prefix)
+        start = bisect_left(keys, prefix)
+        end = bisect_left(keys, prefix + PREFIX_END, start)
+        return rows[start:end]
+
+    def etag(self, request, load=True):
+        """ETag ответа со списком ингредиентов.
+
+        Хеш содержимого индекса меняется вместе с ингредиентами; к нему
+        добавляются адрес запроса и Accept. С load=False индекс не
+        загружается, а возвращается None.
+        """
+        data = self.get() if load else self.peek()
+        if data is None:
+            return None
+        state = '|'.join((
+            data[2],
+            request.get_full_path(),
+            request.META.get('HTTP_ACCEPT', ''),
+        ))
+        return hashlib.md5(state.encode()).hexdigest()
+
+
+ingredient_index = IngredientIndex()
@@ -0,0 +1,115 @@
+import json
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from api.renderers import FastJSONRenderer
+from api.views import RecipesViewSet
+
+User = get_user_model()
+
+# Название, быстрая выдача рецептов, рендерер.
+MODES = (
+    ('drf', False, JSONRenderer),
+    ('fast', True, FastJSONRenderer),
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает время выдачи списка рецептов через RecipesSerializer '
+        'и JSONRenderer с быстрой выдачей на orjson и проверяет, что ответы '
+        'совпадают'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pages', type=int, default=20)
+        parser.add_argument('--limit', type=int, default=20)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument(
+            '--user-id', type=int,
+            help='Пользователь, от имени которого делаются запросы'
+        )
+
+    def get_host(self):
+        host = settings.ALLOWED_HOSTS[0] if settings.ALLOWED_HOSTS else '*'
+        return 'localhost' if host.startswith(('*', '.')) else host
+
+    def request(self, view, fast, page, options):
+        request = self.factory.get(
+            '/api/recipes/', {'page': page, 'limit': options['limit']}
+        )
+        if self.user:
+            force_authenticate(request, self.user)
+        with override_settings(FAST_RECIPE_SERIALIZER=fast):
+            started = time.perf_counter()
+            response = view(request)
+            rendered = time.perf_counter()
+            response.render()
+            finished = time.perf_counter()
+        if response.status_code != 200:
+            raise CommandError(
+                f'Страница {page}: ответ {response.status_code}.'
+            )
+        return response.content, rendered - started, finished - rendered
+
+    def handle(self, *args, **options):
+        self.factory = APIRequestFactory(HTTP_HOST=self.get_host())
+        self.user = None
+        if options['user_id']:
+            self.user = User.objects.filter(pk=options['user_id']).first()
+            if self.user is None:
+                raise CommandError('Пользователь не найден.')
+        views = {
+            name: RecipesViewSet.as_view(
+                {'get': 'list'}, renderer_classes=(renderer,)
+            )
+            for name, _, renderer in MODES
+        }
+        timings = {name: ([], []) for name, _, _ in MODES}
+        mismatches = 0
+        pages = range(1, options['pages'] + 1)
+        for attempt in range(options['repeat'] + 1):
+            for page in pages:
+                contents = {}
+                for name, fast, _ in MODES:
+                    contents[name], build, render = self.request(
+                        views[name], fast, page, options
+                    )
+                    if attempt:
+                        timings[name][0].append(build)
+                        timings[name][1].append(render)
+                if not attempt:
+                    standard, quick = (
+                        json.loads(contents[name]) for name, *_ in MODES
+                    )
+                    mismatches += standard != quick
+
+        self.stdout.write(
+            f'{"вариант":<10}{"сборка, мс":>12}{"рендер, мс":>12}'
+            f'{"всего, мс":>12}{"p95, мс":>10}'
+        )
+        for name, _, _ in MODES:
+            build, render = timings[name]
+            totals = [first + second for first, second in zip(build, render)]
+            p95 = (
+                statistics.quantiles(totals, n=20)[18]
+                if len(totals) > 1 else totals[0]
+            )
+            self.stdout.write(
+                f'{name:<10}{statistics.mean(build) * 1000:>12.2f}'
+                f'{statistics.mean(render) * 1000:>12.2f}'
+                f'{statistics.mean(totals) * 1000:>12.2f}{p95 * 1000:>10.2f}'
+            )
+        message = (
+            f'Страниц с разными ответами: {mismatches} из {len(pages)}.'
+        )
+        if mismatches:
+            raise CommandError(message)
+        self.stdout.write(self.style.SUCCESS(message))
@@ -0,0 +1,107 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from api.shopping_list import get_ingredients
+from recipes.models import FeedEntry, Ingredient, Recipe
+from users.models import Follow
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Проверяет планы основных запросов API: завершается ошибкой, '
+        'если какой-либо план читает большую таблицу целиком'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--min-rows', type=int, default=10000,
+            help='Таблицы от этого числа строк считаются большими'
+        )
+        parser.add_argument(
+            '--user-id', type=int, default=1,
+            help='Пользователь, от имени которого строятся запросы'
+        )
+
+    def get_queries(self, user):
+        recipes = Recipe.objects.for_user(user)
+        return (
+            ('Список рецептов', recipes[:6]),
+            ('Рецепт', recipes.filter(pk=1)),
+            ('Рецепты по тегам',
+             recipes.filter(id__in=Recipe.tags.through.objects.filter(
+                 tag_id__in=(1,)).values('recipe_id'))[:6]),
+            ('Поиск рецептов', recipes.search('домашний суп')[:6]),
+            ('Похожие рецепты',
+             Recipe.objects.filter(similar_to__recipe_id=1).order_by(
+                 '-similar_to__score')),
+            ('Рецепты автора', recipes.filter(author=user)[:6]),
+            ('Избранное', recipes.filter(favorites__user=user)[:6]),
+            ('Рецепты в покупках',
+             recipes.filter(shopping_cart__user=user)[:6]),
+            ('Поиск ингредиента',
+             Ingredient.objects.filter(name__istartswith='абр')),
+            ('Список покупок', get_ingredients(user)),
+            ('Лента подписок',
+             FeedEntry.objects.filter(user=user).order_by(
+                 '-pub_date', '-recipe_id').values_list(
+                 'pub_date', 'recipe_id')[:7]),
+            ('Подписки', User.objects.filter(author__follower=user)[:6]),
+            ('Проверка подписки',
+             Follow.objects.filter(follower=user, author=user)),
+            ('Подписчики автора', Follow.objects.filter(author=user)),
+        )
+
+    def get_table_sizes(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT relname, reltuples FROM pg_class WHERE relkind = 'r'"
+            )
+            return {name: max(rows, 0) for name, rows in cursor.fetchall()}
+
+    def explain(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return plan[0]['Plan']
+
+    def seq_scans(self, plan):
+        if plan.get('Node Type') == 'Seq Scan':
+            yield plan['Relation Name']
+        for child in plan.get('Plans', ()):
+            yield from self.seq_scans(child)
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Проверка планов работает только с PostgreSQL.')
+        user = User(pk=options['user_id'])
+        table_sizes = self.get_table_sizes()
+        failures = []
+        for label, queryset in self.get_queries(user):
+            plan = self.explain(queryset)
+            if options['verbosity'] > 1:
+                self.stdout.write(json.dumps(plan, indent=2))
+            large_scans = sorted({
+                table for table in self.seq_scans(plan)
+                if table_sizes.get(table, 0) >= options['min_rows']
+            })
+            if large_scans:
+                failures.append(label)
+                self.stdout.write(self.style.ERROR(
+                    f'{label}: последовательное чтение '
+                    f'{", ".join(large_scans)}'
+                ))
+            else:
+                self.stdout.write(f'{label}: OK')
+        if failures:
+            raise CommandError(
+                f'Последовательное чтение больших таблиц: {len(failures)}.'
+            )
+        self.stdout.write(self.style.SUCCESS('Все планы используют индексы.'))
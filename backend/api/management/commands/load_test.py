@@ -0,0 +1,189 @@
+import os
+import random
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+
+import requests
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Доля каждого сценария в общем потоке запросов.
+SCENARIOS = (
+    ('list', 30),
+    ('filter_tags', 15),
+    ('detail', 25),
+    ('favorite', 10),
+    ('download_cart', 5),
+    ('subscriptions', 15),
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагружает запущенный сервер смешанными запросами к API и выводит '
+        'задержки p50/p95/p99 и пропускную способность по сценариям'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000')
+        parser.add_argument('--duration', type=float, default=30)
+        parser.add_argument('--concurrency', type=int, default=16)
+        parser.add_argument(
+            '--accounts', type=int, default=20,
+            help='Сколько пользователей seed_data авторизовать'
+        )
+        parser.add_argument('--prefix', default='seed')
+        parser.add_argument('--password', default='seed-password')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--start-server', action='store_true',
+            help='Запустить gunicorn с текущими настройками на время теста'
+        )
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument(
+            '--server-mode', choices=('wsgi', 'asgi'), default='wsgi',
+            help='Воркеры gunicorn для --start-server: sync или uvicorn'
+        )
+
+    def start_server(self, url, workers, mode):
+        bind = url.split('://', 1)[-1].rstrip('/')
+        server = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', '--config', 'gunicorn.conf.py',
+             '--bind', bind, '--workers', str(workers)],
+            cwd=settings.BASE_DIR,
+            env={**os.environ,
+                 'SERVER_MODE': mode,
+                 'DJANGO_SETTINGS_MODULE': os.environ.get(
+                     'DJANGO_SETTINGS_MODULE', 'backend.settings')},
+        )
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            try:
+                requests.get(f'{url}/api/tags/', timeout=1)
+                return server
+            except requests.ConnectionError:
+                time.sleep(0.2)
+        server.terminate()
+        raise CommandError('Сервер не запустился за 30 секунд.')
+
+    def login(self, url, options):
+        tokens = []
+        for index in range(options['accounts']):
+            response = requests.post(f'{url}/api/auth/token/login/', json={
+                'email': f'{options["prefix"]}_user_{index}@example.com',
+                'password': options['password'],
+            })
+            if response.ok:
+                tokens.append(response.json()['auth_token'])
+        if not tokens:
+            raise CommandError(
+                'Не удалось авторизоваться: выполните seed_data.'
+            )
+        return tokens
+
+    def discover(self, url):
+        tags = [tag['slug'] for tag in requests.get(f'{url}/api/tags/').json()]
+        recipe_ids = []
+        next_url = f'{url}/api/recipes/?cursor=&limit=100'
+        while next_url and len(recipe_ids) < 1000:
+            page = requests.get(next_url).json()
+            recipe_ids += [recipe['id'] for recipe in page['results']]
+            next_url = page['next']
+        if not recipe_ids:
+            raise CommandError('Нет рецептов: выполните seed_data.')
+        return tags, recipe_ids
+
+    def scenario_requests(self, name, rng):
+        """Запросы сценария в виде (метод, путь)."""
+        if name == 'list':
+            return [('get', f'/api/recipes/?page={rng.randint(1, 20)}')]
+        if name == 'filter_tags':
+            tags = rng.sample(self.tags, min(2, len(self.tags)))
+            query = '&'.join(f'tags={slug}' for slug in tags)
+            return [('get', f'/api/recipes/?{query}')]
+        recipe_id = rng.choice(self.recipe_ids)
+        if name == 'detail':
+            return [('get', f'/api/recipes/{recipe_id}/')]
+        if name == 'favorite':
+            path = f'/api/recipes/{recipe_id}/favorite/'
+            return [('post', path), ('delete', path)]
+        if name == 'download_cart':
+            return [('get', '/api/recipes/download_shopping_cart/')]
+        return [('get', '/api/users/subscriptions/?recipes_limit=3')]
+
+    def worker(self, url, token, seed, deadline):
+        rng = random.Random(seed)
+        names, weights = zip(*SCENARIOS)
+        session = requests.Session()
+        session.headers['Authorization'] = f'Token {token}'
+        while time.monotonic() < deadline:
+            name = rng.choices(names, weights=weights)[0]
+            for method, path in self.scenario_requests(name, rng):
+                started = time.perf_counter()
+                try:
+                    response = session.request(method, url + path)
+                    response.content
+                    failed = response.status_code >= 500
+                except requests.RequestException:
+                    failed = True
+                elapsed = time.perf_counter() - started
+                with self.lock:
+                    self.latencies[name].append(elapsed)
+                    self.errors[name] += failed
+
+    def report(self, duration):
+        self.stdout.write(
+            f'{"сценарий":<15}{"запросов":>10}{"ошибок":>8}{"rps":>9}'
+            f'{"p50, мс":>10}{"p95, мс":>10}{"p99, мс":>10}'
+        )
+        for name, _ in SCENARIOS:
+            latencies = self.latencies[name]
+            if len(latencies) < 2:
+                continue
+            cuts = statistics.quantiles(latencies, n=100)
+            p50, p95, p99 = (cuts[index] * 1000 for index in (49, 94, 98))
+            self.stdout.write(
+                f'{name:<15}{len(latencies):>10}{self.errors[name]:>8}'
+                f'{len(latencies) / duration:>9.1f}'
+                f'{p50:>10.1f}{p95:>10.1f}{p99:>10.1f}'
+            )
+        total = sum(len(latencies) for latencies in self.latencies.values())
+        self.stdout.write(self.style.SUCCESS(
+            f'Всего: {total} запросов, {total / duration:.1f} rps.'
+        ))
+
+    def handle(self, *args, **options):
+        url = options['url'].rstrip('/')
+        server = None
+        if options['start_server']:
+            server = self.start_server(
+                url, options['workers'], options['server_mode']
+            )
+        try:
+            tokens = self.login(url, options)
+            self.tags, self.recipe_ids = self.discover(url)
+            self.lock = threading.Lock()
+            self.latencies = defaultdict(list)
+            self.errors = defaultdict(int)
+            started = time.monotonic()
+            deadline = started + options['duration']
+            threads = [
+                threading.Thread(target=self.worker, args=(
+                    url, tokens[index % len(tokens)],
+                    options['seed'] + index, deadline
+                ))
+                for index in range(options['concurrency'])
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            self.report(time.monotonic() - started)
+        finally:
+            if server:
+                server.terminate()
+                server.wait()
@@ -0,0 +1,228 @@
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.http import HttpResponse
+
+# Границы корзин гистограммы длительности запросов, в секундах.
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+current_timings = ContextVar('current_timings', default=None)
+
+
+class RequestTimings:
+    """Время и число запросов к БД, время сериализаторов и рендеринга
+    ответа одного запроса.
+
+    Экземпляр подключается к соединениям через execute_wrapper.
+    """
+
+    def __init__(self):
+        self.queries = 0
+        self.db = 0.0
+        self.serialize = 0.0
+        self.render = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db += time.perf_counter() - started
+            self.queries += 1
+
+
+def track_queries(execute, sql, params, many, context):
+    """execute_wrapper, относящий запрос к замерам текущего запроса.
+
+    Замеры берутся из контекста, поэтому учитываются и запросы из потоков,
+    в которых асинхронные представления выполняют синхронный код.
+    """
+    timings = current_timings.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    return timings(execute, sql, params, many, context)
+
+
+def instrument_connection(sender, connection, **kwargs):
+    if track_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(track_queries)
+
+
+def add_time(function, attribute):
+    """Оборачивает function, прибавляя время вызова к атрибуту замеров
+    текущего запроса."""
+
+    @wraps(function)
+    def wrapper(*args, **kwargs):
+        timings = current_timings.get()
+        started = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            if timings is not None:
+                setattr(timings, attribute, getattr(timings, attribute)
+                        + time.perf_counter() - started)
+
+    return wrapper
+
+
+def timed_render(render):
+    """Учитывает время render() рендерера в метриках текущего запроса."""
+    return add_time(render, 'render')
+
+
+class TimedSerializerMixin:
+    """Учитывает построение данных сериализаторов представления.
+
+    Оборачивается to_representation() только экземпляров, созданных
+    get_serializer(): вложенные сериализаторы входят в их время, а класс
+    BaseSerializer не меняется.
+    """
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        serializer.to_representation = add_time(
+            serializer.to_representation, 'serialize'
+        )
+        return serializer
+
+
+def empty_stats():
+    return {
+        'buckets': [0] * (len(BUCKETS) + 1),
+        'count': 0,
+        'sum': 0.0,
+        'queries': 0,
+        'db': 0.0,
+    }
+
+
+class RequestMetrics:
+    """Метрики запросов по маршрутам в формате Prometheus.
+
+    Значения копятся в памяти процесса. Если задан METRICS_DIR, воркер
+    не реже раза в dump_interval секунд сохраняет их в свой файл в этом
+    каталоге, а /metrics отдаёт сумму по всем файлам, включая файлы
+    завершившихся воркеров; каталог очищается при запуске gunicorn.
+    Без METRICS_DIR ряды помечены pid, и каждый воркер отдаёт свои.
+    """
+
+    dump_interval = 1
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.routes = {}
+        self.dumped_at = 0.0
+
+    def observe(self, method, route, duration, timings):
+        with self.lock:
+            stats = self.routes.setdefault((method, route), empty_stats())
+            stats['buckets'][bisect_left(BUCKETS, duration)] += 1
+            stats['count'] += 1
+            stats['sum'] += duration
+            stats['queries'] += timings.queries
+            stats['db'] += timings.db
+        if (
+            settings.METRICS_DIR
+            and time.monotonic() - self.dumped_at > self.dump_interval
+        ):
+            self.dump()
+
+    def snapshot(self):
+        with self.lock:
+            return [
+                (key, dict(stats, buckets=list(stats['buckets'])))
+                for key, stats in self.routes.items()
+            ]
+
+    def dump(self):
+        """Атомарно записывает метрики процесса в METRICS_DIR.
+
+        Ошибка записи не должна ломать запрос, поэтому она пропускается:
+        в сумме останутся прошлые значения процесса.
+        """
+        self.dumped_at = time.monotonic()
+        path = os.path.join(settings.METRICS_DIR, f'{os.getpid()}.json')
+        temporary = f'{path}.{threading.get_ident()}.tmp'
+        try:
+            os.makedirs(settings.METRICS_DIR, exist_ok=True)
+            with open(temporary, 'w') as file:
+                json.dump([
+                    [method, route, stats]
+                    for (method, route), stats in self.snapshot()
+                ], file)
+            os.replace(temporary, path)
+        except OSError:
+            pass
+
+    def collect(self):
+        """Сумма метрик всех воркеров из METRICS_DIR."""
+        self.dump()
+        try:
+            names = os.listdir(settings.METRICS_DIR)
+        except OSError:
+            return self.snapshot()
+        routes = {}
+        for name in names:
+            if not name.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(settings.METRICS_DIR, name)) as file:
+                    rows = json.load(file)
+            except (OSError, ValueError):
+                continue
+            for method, route, stats in rows:
+                total = routes.setdefault((method, route), empty_stats())
+                total['buckets'] = [
+                    count + other for count, other
+                    in zip(total['buckets'], stats['buckets'])
+                ]
+                for field in ('count', 'sum', 'queries', 'db'):
+                    total[field] += stats[field]
+        return list(routes.items())
+
+    def render(self):
+        lines = [
+            '# TYPE foodgram_request_duration_seconds histogram',
+            '# TYPE foodgram_request_db_queries_total counter',
+            '# TYPE foodgram_request_db_duration_seconds_total counter',
+        ]
+        if settings.METRICS_DIR:
+            routes, process = self.collect(), ''
+        else:
+            routes, process = self.snapshot(), f',pid="{os.getpid()}"'
+        for (method, route), stats in sorted(routes):
+            labels = f'method="{method}",route="{route}"{process}'
+            total = 0
+            for bound, count in zip((*BUCKETS, '+Inf'), stats['buckets']):
+                total += count
+                lines.append(
+                    'foodgram_request_duration_seconds_bucket'
+                    f'{{{labels},le="{bound}"}} {total}'
+                )
+            lines += [
+                f'foodgram_request_duration_seconds_sum{{{labels}}} '
+                f'{stats["sum"]}',
+                f'foodgram_request_duration_seconds_count{{{labels}}} '
+                f'{stats["count"]}',
+                f'foodgram_request_db_queries_total{{{labels}}} '
+                f'{stats["queries"]}',
+                f'foodgram_request_db_duration_seconds_total{{{labels}}} '
+                f'{stats["db"]}',
+            ]
+        return '\n'.join(lines) + '\n'
+
+
+request_metrics = RequestMetrics()
+
+
+def metrics(request):
+    return HttpResponse(
+        request_metrics.render(), content_type='text/plain; version=0.0.4'
+    )
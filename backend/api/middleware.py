@@ -0,0 +1,152 @@
+import asyncio
+import hashlib
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils.deprecation import MiddlewareMixin
+
+from api.db_router import REPLICA, read_database
+from api.metrics import RequestTimings, current_timings, request_metrics
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+PIN_COOKIE = 'primary_until'
+
+
+class RequestMetricsMiddleware(MiddlewareMixin):
+    """Замеряет запрос и отдаёт замеры в заголовке Server-Timing.
+
+    db — запросы к БД, view — работа представления, serialize — время
+    его сериализаторов, render — перевод ответа в байты рендерером DRF.
+    Работает и в асинхронной цепочке, чтобы под ASGI не переводить
+    запросы в общий синхронный поток.
+    """
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        timings, token, started = self.start(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_timings.reset(token)
+        return self.finish(request, response, timings, started)
+
+    async def __acall__(self, request):
+        timings, token, started = self.start(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_timings.reset(token)
+        return self.finish(request, response, timings, started)
+
+    def start(self, request):
+        timings = RequestTimings()
+        request.timings = timings
+        return timings, current_timings.set(timings), time.perf_counter()
+
+    def finish(self, request, response, timings, started):
+        finished = time.perf_counter()
+        view_started = getattr(timings, 'view_started', started)
+        view_finished = getattr(timings, 'view_finished', finished)
+        response['Server-Timing'] = ', '.join((
+            f'db;dur={timings.db * 1000:.1f};desc="{timings.queries} queries"',
+            f'view;dur={(view_finished - view_started) * 1000:.1f}',
+            f'serialize;dur={timings.serialize * 1000:.1f}',
+            f'render;dur={timings.render * 1000:.1f}',
+            f'total;dur={(finished - started) * 1000:.1f}',
+        ))
+        match = request.resolver_match
+        request_metrics.observe(
+            request.method,
+            match.view_name if match else 'unmatched',
+            finished - started,
+            timings,
+        )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.timings.view_started = time.perf_counter()
+
+    def process_template_response(self, request, response):
+        request.timings.view_finished = time.perf_counter()
+        return response
+
+
+class ReplicaRoutingMiddleware(MiddlewareMixin):
+    """Направляет безопасные запросы к API на реплику.
+
+    После успешной записи клиент получает куку, а в общем кэше ставится
+    отметка по его токену, и до их истечения запросы читают из основной
+    базы, чтобы были видны свои изменения. У пользователя один токен,
+    поэтому отметка действует и для других его клиентов. Без реплики
+    в DATABASES отключается.
+    """
+
+    def __init__(self, get_response):
+        if REPLICA not in settings.DATABASES:
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        token = read_database.set(self.read_alias(request))
+        try:
+            response = self.get_response(request)
+        finally:
+            read_database.reset(token)
+        return self.pin(request, response)
+
+    async def __acall__(self, request):
+        # Кэш синхронный: к нему обращаются только запросы с токеном.
+        if self.pin_key(request):
+            alias = await sync_to_async(self.read_alias)(request)
+        else:
+            alias = self.read_alias(request)
+        token = read_database.set(alias)
+        try:
+            response = await self.get_response(request)
+        finally:
+            read_database.reset(token)
+        if self.pin_key(request):
+            return await sync_to_async(self.pin)(request, response)
+        return self.pin(request, response)
+
+    def pin_key(self, request):
+        """Ключ отметки в кэше по токену из заголовка Authorization."""
+        header = request.META.get('HTTP_AUTHORIZATION', '').split()
+        if len(header) != 2 or header[0] != 'Token':
+            return None
+        return f'{PIN_COOKIE}:{hashlib.sha256(header[1].encode()).hexdigest()}'
+
+    def read_alias(self, request):
+        if (
+            request.method not in SAFE_METHODS
+            or not request.path.startswith('/api/')
+        ):
+            return None
+        try:
+            pinned_until = float(request.COOKIES.get(PIN_COOKIE, 0))
+        except ValueError:
+            pinned_until = 0
+        if pinned_until > time.time():
+            return None
+        key = self.pin_key(request)
+        if key and cache.get(key):
+            return None
+        return REPLICA
+
+    def pin(self, request, response):
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            seconds = settings.REPLICA_PIN_SECONDS
+            response.set_cookie(
+                PIN_COOKIE, f'{time.time() + seconds:.3f}',
+                max_age=seconds, httponly=True, samesite='Lax'
+            )
+            key = self.pin_key(request)
+            if key:
+                cache.set(key, True, seconds)
+        return response
@@ -1,6 +1,146 @@
+import base64
+import binascii
+import json
+from collections import OrderedDict
+from datetime import datetime
+
+from django.db import connections
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from recipes import feeds
+from recipes.models import before_position
 
 
 class RecipePagination(PageNumberPagination):
+    """Постраничная выдача рецептов.
+
+    С параметром cursor переключается на выдачу по ключу (pub_date, id):
+    следующая страница выбирается условием по индексу вместо OFFSET.
+    Поиск по названию с курсором не сочетается: его порядок — по рангу.
+    Общее количество в этом режиме считается только по запросу:
+    count=exact — точно, count=estimate — по оценке планировщика.
+    """
+
+    page_size_query_param = 'limit'
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    invalid_cursor_message = 'Недопустимый курсор.'
+    search_cursor_message = (
+        'Результаты поиска упорядочены по релевантности и не выдаются '
+        'по курсору.'
+    )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_mode = self.cursor_query_param in request.query_params
+        if not self.cursor_mode:
+            return super().paginate_queryset(queryset, request, view)
+
+        if 'rank' in queryset.query.annotations:
+            raise ValidationError({
+                self.cursor_query_param: self.search_cursor_message
+            })
+        self.request = request
+        page_size = self.get_page_size(request)
+        queryset = queryset.order_by('-pub_date', '-id')
+        self.count = self.get_count(queryset, request)
+        position = self.decode_cursor(request)
+        if position:
+            queryset = queryset.filter(before_position(*position))
+        page = list(queryset[:page_size + 1])
+        self.next_position = None
+        if len(page) > page_size:
+            page = page[:page_size]
+            self.next_position = self.get_position(page[-1])
+        return page
+
+    def get_position(self, recipe):
+        if isinstance(recipe, dict):
+            return recipe['pub_date'], recipe['id']
+        return recipe.pub_date, recipe.id
+
+    def get_count(self, queryset, request):
+        mode = request.query_params.get(self.count_query_param)
+        if mode == 'exact':
+            return queryset.count()
+        if mode == 'estimate':
+            return self.estimate_count(queryset)
+        return None
+
+    def estimate_count(self, queryset):
+        connection = connections[queryset.db]
+        if connection.vendor != 'postgresql':
+            return queryset.count()
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]['Plan']['Plan Rows'])
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            pub_date, pk = base64.urlsafe_b64decode(
+                encoded.encode()
+            ).decode().split('|')
+            return datetime.fromisoformat(pub_date), int(pk)
+        except (binascii.Error, UnicodeDecodeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, position):
+        pub_date, pk = position
+        return base64.urlsafe_b64encode(
+            f'{pub_date.isoformat()}|{pk}'.encode()
+        ).decode()
+
+    def get_next_link(self):
+        if not self.cursor_mode:
+            return super().get_next_link()
+        if self.next_position is None:
+            return None
+        url = remove_query_param(
+            self.request.build_absolute_uri(), self.page_query_param
+        )
+        return replace_query_param(
+            url, self.cursor_query_param,
+            self.encode_cursor(self.next_position)
+        )
+
+    def get_paginated_response(self, data):
+        if not self.cursor_mode:
+            return super().get_paginated_response(data)
+        return Response(OrderedDict([
+            ('count', self.count),
+            ('next', self.get_next_link()),
+            ('previous', None),
+            ('results', data),
+        ]))
+
+
+class FeedPagination(RecipePagination):
+    """Выдача ленты подписок: всегда по ключу (pub_date, id), без count."""
+
+    def paginate_feed(self, user, request):
+        """Id рецептов страницы ленты в порядке выдачи."""
+        self.cursor_mode = True
+        self.request = request
+        self.count = None
+        page_size = self.get_page_size(request)
+        rows = feeds.read(user.id, self.decode_cursor(request), page_size + 1)
+        self.next_position = None
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            self.next_position = rows[-1]
+        return [recipe_id for _, recipe_id in rows]
+
+
+class PantryPagination(PageNumberPagination):
+    """Постраничная выдача поиска по продуктам."""
 
     page_size_query_param = 'limit'
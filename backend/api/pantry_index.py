@@ -0,0 +1,172 @@
+from collections import defaultdict
+from functools import reduce
+from itertools import islice
+from operator import or_
+from typing import Dict, FrozenSet, List, NamedTuple
+
+from api.process_cache import ProcessCache
+from recipes.models import Recipe, RecipeIngredient
+
+
+def popcount(bitset):
+    return bin(bitset).count('1')
+
+
+def positions(bitset):
+    """Номера установленных битов по убыванию: от новых рецептов
+    к старым."""
+    while bitset:
+        highest = bitset.bit_length() - 1
+        yield highest
+        bitset ^= 1 << highest
+
+
+class PantryData(NamedTuple):
+    # Рецепт хранится битом: номер бита — позиция рецепта в ids, рецепты
+    # идут от старых к новым, новые дописываются в конец.
+    ids: List[int]
+    positions: Dict[int, int]
+    # Рецепты каждого ингредиента.
+    bitsets: Dict[int, int]
+    # Рецепты с данным числом ингредиентов.
+    sizes: Dict[int, int]
+    ingredients: Dict[int, FrozenSet[int]]
+
+
+class PantryMatches:
+    """Рецепты, в которых есть хотя бы один из продуктов, по возрастанию
+    числа недостающих ингредиентов, внутри — от новых к старым.
+
+    Поддерживает len() и срезы, поэтому передаётся в пагинатор как есть.
+    """
+
+    def __init__(self, data, ingredient_ids):
+        bitsets = [data.bitsets[pk] for pk in set(ingredient_ids)
+                   if data.bitsets.get(pk)]
+        # Число найденных продуктов каждого рецепта в двоичной записи:
+        # planes[i] — рецепты, у которых установлен i-й бит этого числа.
+        planes = []
+        for carry in bitsets:
+            for index, plane in enumerate(planes):
+                planes[index], carry = plane ^ carry, plane & carry
+                if not carry:
+                    break
+            if carry:
+                planes.append(carry)
+        found = reduce(or_, bitsets, 0)
+        by_found = {}
+        for count in range(1, 1 << len(planes)):
+            recipes = found
+            for index, plane in enumerate(planes):
+                recipes &= plane if count >> index & 1 else ~plane
+            if recipes:
+                by_found[count] = recipes
+        self.groups = []
+        for missing in range(max(data.sizes, default=0) + 1):
+            group = 0
+            for count, recipes in by_found.items():
+                group |= recipes & data.sizes.get(count + missing, 0)
+            if group:
+                self.groups.append(group)
+        self.ids = data.ids
+        self.total = popcount(found)
+
+    def __len__(self):
+        return self.total
+
+    def __getitem__(self, index):
+        start, stop, _ = index.indices(self.total)
+        page = []
+        for group in self.groups:
+            size = popcount(group)
+            if start < size and stop > 0:
+                page += islice(positions(group), start, min(stop, size))
+            start, stop = max(start - size, 0), stop - size
+        return [self.ids[position] for position in page]
+
+
+class PantryIndex(ProcessCache):
+    """Инвертированный индекс ингредиент → рецепты в памяти процесса.
+
+    Множества рецептов хранятся несжатыми битовыми масками в целых числах:
+    до N/8 байт на ингредиент (12 КБ при 100 тыс. рецептов), зато число
+    найденных продуктов для всех рецептов сразу считается побитовыми
+    операциями без выделения памяти под каждый рецепт. Для каталогов
+    на порядки больше стоит перейти на отсортированные массивы id.
+    Рецепты, изменённые в этом процессе, обновляются на месте.
+    """
+
+    ttl_setting = 'PANTRY_INDEX_TTL'
+
+    def load(self):
+        ids = list(Recipe.objects.order_by(
+            'pub_date', 'id'
+        ).values_list('id', flat=True))
+        data = PantryData(
+            ids, {recipe_id: position for position, recipe_id
+                  in enumerate(ids)}, {}, {}, {}
+        )
+        recipes = defaultdict(set)
+        for recipe_id, ingredient_id in RecipeIngredient.objects.values_list(
+            'recipe_id', 'ingredient_id'
+        ).iterator():
+            recipes[recipe_id].add(ingredient_id)
+        self.apply(data, recipes)
+        return data
+
+    def apply(self, data, recipes):
+        """Записывает в data новые наборы ингредиентов рецептов."""
+        for recipe_id, ingredient_ids in recipes.items():
+            position = data.positions.get(recipe_id)
+            if position is None:
+                if not ingredient_ids:
+                    continue
+                position = data.positions[recipe_id] = len(data.ids)
+                data.ids.append(recipe_id)
+            bit = 1 << position
+            old = data.ingredients.pop(position, ())
+            for ingredient_id in old:
+                data.bitsets[ingredient_id] &= ~bit
+            if old:
+                data.sizes[len(old)] &= ~bit
+            for ingredient_id in ingredient_ids:
+                data.bitsets[ingredient_id] = (
+                    data.bitsets.get(ingredient_id, 0) | bit
+                )
+            if ingredient_ids:
+                data.sizes[len(ingredient_ids)] = (
+                    data.sizes.get(len(ingredient_ids), 0) | bit
+                )
+                data.ingredients[position] = frozenset(ingredient_ids)
+
+    def refresh(self, recipe_ids):
+        """Перечитывает ингредиенты рецептов, если индекс загружен.
+
+        Копируются только словари, которые читают запросы, — маски
+        ингредиентов и размеров, а не данные по каждому рецепту: ids
+        только дописывается, остальное читает лишь обновление под
+        блокировкой. Так параллельные запросы видят индекс целиком до
+        или после обновления.
+        """
+        if self.peek() is None:
+            return
+        recipes = {recipe_id: set() for recipe_id in recipe_ids}
+        for recipe_id, ingredient_id in RecipeIngredient.objects.filter(
+            recipe_id__in=recipes
+        ).values_list('recipe_id', 'ingredient_id'):
+            recipes[recipe_id].add(ingredient_id)
+        with self._lock:
+            data = self._data
+            if data is None:
+                return
+            data = data._replace(
+                bitsets=data.bitsets.copy(), sizes=data.sizes.copy()
+            )
+            self.apply(data, recipes)
+            self._data = data
+
+    def search(self, ingredient_ids):
+        return PantryMatches(self.get(), ingredient_ids)
+
+
+pantry_index = PantryIndex()
@@ -8,4 +8,4 @@ class IsAuthorOrReadOnly(BasePermission):
                 or request.user.is_authenticated)
 
     def has_object_permission(self, request, view, obj):
-        return obj.author == request.user or request.method in SAFE_METHODS
+        return request.method in SAFE_METHODS or obj.author == request.user
@@ -0,0 +1,48 @@
+import threading
+import time
+
+from django.conf import settings
+
+
+class ProcessCache:
+    """Данные из БД, хранящиеся в памяти процесса.
+
+    Загружаются лениво при первом обращении, сбрасываются invalidate()
+    (обработчики сигналов этого процесса) и перезагружаются по истечении
+    ttl_setting секунд, чтобы подхватить изменения из других процессов.
+    """
+
+    ttl_setting = None
+    default_ttl = 300
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data = None
+        self._built_at = 0.0
+
+    def load(self):
+        raise NotImplementedError
+
+    def invalidate(self):
+        self._data = None
+
+    def _get_fresh(self):
+        data = self._data
+        ttl = getattr(settings, self.ttl_setting, self.default_ttl)
+        if data is None or (ttl and time.monotonic() - self._built_at > ttl):
+            return None
+        return data
+
+    def peek(self):
+        """Возвращает загруженные данные или None, не обращаясь к БД."""
+        return self._get_fresh()
+
+    def get(self):
+        data = self._get_fresh()
+        if data is None:
+            with self._lock:
+                data = self._get_fresh()
+                if data is None:
+                    data = self._data = self.load()
+                    self._built_at = time.monotonic()
+        return data
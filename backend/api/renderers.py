@@ -0,0 +1,68 @@
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+from api.metrics import timed_render
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSON-рендерер на orjson с тем же выводом, что у JSONRenderer.
+
+    Даты и прочие типы, которые orjson записывает иначе, передаются
+    кодировщику DRF. Без orjson, а также при нестандартных UNICODE_JSON,
+    COMPACT_JSON и для вывода с отступами работает как обычный
+    JSONRenderer.
+    """
+
+    options = (
+        orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if orjson else 0
+    )
+
+    @timed_render
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None
+            or self.ensure_ascii
+            or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {})
+        ):
+            return super().render(
+                data, accepted_media_type, renderer_context
+            )
+        if data is None:
+            return b''
+        return orjson.dumps(
+            data, default=JSONEncoder().default, option=self.options
+        ).replace(
+            '\u2028'.encode(), b'\\u2028'
+        ).replace(
+            '\u2029'.encode(), b'\\u2029'
+        )
+
+
+class PlainTextRenderer(BaseRenderer):
+    """Рендерер для текстовых выгрузок."""
+
+    media_type = 'text/plain'
+    format = 'txt'
+    charset = 'utf-8'
+
+    @timed_render
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if isinstance(data, dict) and 'detail' in data:
+            data = data['detail']
+        return str(data).encode(self.charset)
+
+
+class CSVRenderer(PlainTextRenderer):
+    """Рендерер для выгрузок в CSV."""
+
+    media_type = 'text/csv'
+    format = 'csv'
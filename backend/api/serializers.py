@@ -1,9 +1,11 @@
 from django.contrib.auth import get_user_model
+from django.db import transaction
 from djoser.serializers import UserSerializer, UserCreateSerializer
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
 
 from api.fields import Base64ImageField
+from recipes import shopping_lists, similarity
 from recipes.models import (
     Tag, Ingredient, Recipe, RecipeIngredient, Favorite, ShoppingCart
 )
@@ -50,6 +52,8 @@ class CustomUserSerializer(UserSerializer):
         )
 
     def get_is_subscribed(self, obj):
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         return (
             self.context.get('request').user.is_authenticated
             and Follow.objects.filter(
@@ -71,6 +75,17 @@ class CustomUserAvatarSerializer(UserSerializer):
         )
 
 
+def get_recipes_limit(request):
+    """Проверенное значение параметра recipes_limit или None."""
+    limit = request.query_params.get('recipes_limit')
+    if not limit:
+        return None
+    try:
+        return serializers.IntegerField(min_value=1).run_validation(limit)
+    except ValidationError as error:
+        raise ValidationError({'recipes_limit': error.detail})
+
+
 class FollowSerializer(CustomUserSerializer):
     """Сериализатор для подписок"""
 
@@ -88,20 +103,23 @@ class FollowSerializer(CustomUserSerializer):
             'is_subscribed',
             'recipes',
             'recipes_count',
+            'followers_count',
             'avatar'
         )
 
     def get_recipes(self, obj):
-        request = self.context.get('request')
-        limit = request.GET.get('recipes_limit')
-        recipes = Recipe.objects.filter(author=obj.id)
-        if limit:
-            recipes = recipes[:int(limit)]
+        if hasattr(obj, 'recipes_preview'):
+            recipes = obj.recipes_preview
+        else:
+            limit = get_recipes_limit(self.context.get('request'))
+            recipes = Recipe.objects.filter(author=obj.id)
+            if limit:
+                recipes = recipes[:limit]
         serializer = ShortRecipeSerializer(recipes, many=True, read_only=True)
         return serializer.data
 
     def get_recipes_count(self, obj):
-        return Recipe.objects.filter(author=obj.id).count()
+        return obj.recipes_count
 
 
 class TagsSerializer(serializers.ModelSerializer):
@@ -146,6 +164,8 @@ class RecipesSerializer(serializers.ModelSerializer):
     is_in_shopping_cart = serializers.SerializerMethodField(read_only=True)
 
     def get_is_favorited(self, obj):
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
         return (
             self.context.get('request').user.is_authenticated
             and Favorite.objects.filter(
@@ -155,6 +175,8 @@ class RecipesSerializer(serializers.ModelSerializer):
         )
 
     def get_is_in_shopping_cart(self, obj):
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
         return (
             self.context.get('request').user.is_authenticated
             and ShoppingCart.objects.filter(
@@ -176,6 +198,7 @@ class RecipesSerializer(serializers.ModelSerializer):
             'cooking_time',
             'is_favorited',
             'is_in_shopping_cart',
+            'favorites_count',
         )
 
 
@@ -216,24 +239,22 @@ class CreateRecipesSerializer(serializers.ModelSerializer):
         if not data.get('tags'):
             raise ValidationError('Нужно добавить хотя бы один тег!')
 
-        ingredients_list = data['ingredients']
-        ingredients = []
-
-        for ingredient in ingredients_list:
-            if not Ingredient.objects.filter(id=ingredient['id']).exists():
-                raise ValidationError('Такого ингредиента нет!')
-            ingredients.append(ingredient['id'])
-            if ingredients.count(ingredient['id']) > 1:
-                raise ValidationError(
-                    'Нельзя включать два одинаковых ингредиента!'
-                )
+        ingredient_ids = [
+            ingredient['id'] for ingredient in data['ingredients']
+        ]
+        unique_ingredient_ids = set(ingredient_ids)
+        if Ingredient.objects.filter(
+            id__in=unique_ingredient_ids
+        ).count() != len(unique_ingredient_ids):
+            raise ValidationError('Такого ингредиента нет!')
+        if len(unique_ingredient_ids) != len(ingredient_ids):
+            raise ValidationError(
+                'Нельзя включать два одинаковых ингредиента!'
+            )
 
-        tags_list = data['tags']
-        tags = []
-        for tag in tags_list:
-            if tag in tags:
-                raise ValidationError('Нельзя указать два одинаковых тега!')
-            tags.append(tag)
+        tags = data['tags']
+        if len(set(tags)) != len(tags):
+            raise ValidationError('Нельзя указать два одинаковых тега!')
         return data
 
     def bulk_create_update(self, ingredients, recipe):
@@ -248,21 +269,56 @@ class CreateRecipesSerializer(serializers.ModelSerializer):
             )
         RecipeIngredient.objects.bulk_create(ingredient_list)
 
+    def update_ingredients(self, ingredients, recipe):
+        """Добавляет новые, изменяет и удаляет убранные ингредиенты."""
+        amounts = {
+            ingredient['id']: ingredient['amount']
+            for ingredient in ingredients
+        }
+        current = {
+            recipe_ingredient.ingredient_id: recipe_ingredient
+            for recipe_ingredient in recipe.recipe_ingredient.all()
+        }
+        removed = current.keys() - amounts.keys()
+        if removed:
+            RecipeIngredient.objects.filter(
+                recipe=recipe, ingredient_id__in=removed
+            ).delete()
+        changed = []
+        # Пакетные операции обходят сигналы: разница для списков покупок.
+        deltas = {}
+        for ingredient_id, recipe_ingredient in current.items():
+            amount = amounts.get(ingredient_id)
+            if amount is not None and recipe_ingredient.amount != amount:
+                deltas[ingredient_id] = amount - recipe_ingredient.amount
+                recipe_ingredient.amount = amount
+                changed.append(recipe_ingredient)
+        if changed:
+            RecipeIngredient.objects.bulk_update(changed, ['amount'])
+        added = [ingredient for ingredient in ingredients
+                 if ingredient['id'] not in current]
+        self.bulk_create_update(added, recipe)
+        deltas.update(
+            (ingredient['id'], ingredient['amount']) for ingredient in added
+        )
+        shopping_lists.change_ingredients(recipe.id, deltas)
+        if removed or added:
+            similarity.mark_changed([recipe.id])
+
+    @transaction.atomic
     def create(self, validated_data):
         ingredients = validated_data.pop('ingredients')
         tags = validated_data.pop('tags')
         recipe = Recipe.objects.create(**validated_data)
         recipe.tags.set(tags)
         self.bulk_create_update(ingredients, recipe)
+        similarity.mark_changed([recipe.id])
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
-        tags = validated_data.pop('tags')
-        instance.tags.clear()
-        instance.tags.set(tags)
-        ingredients = validated_data.pop('ingredients')
-        instance.ingredients.clear()
-        self.bulk_create_update(ingredients, instance)
+        instance.tags.set(validated_data.pop('tags'))
+        self.update_ingredients(validated_data.pop('ingredients'), instance)
         return super().update(instance, validated_data)
 
     def to_representation(self, instance):
@@ -277,3 +333,26 @@ class ShortRecipeSerializer(serializers.ModelSerializer):
     class Meta:
         model = Recipe
         fields = ('id', 'name', 'image', 'cooking_time')
+
+
+class RecipeIdsSerializer(serializers.Serializer):
+    """Список id рецептов для пакетных операций."""
+
+    recipes = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=100,
+    )
+
+    def validate_recipes(self, value):
+        return list(dict.fromkeys(value))
+
+
+class PantrySerializer(serializers.Serializer):
+    """Продукты, из которых пользователь хочет готовить."""
+
+    ingredients = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=100,
+    )
@@ -0,0 +1,74 @@
+import csv
+import json
+
+from django.conf import settings
+
+from recipes.models import ShoppingListItem
+
+FIELDS = ('name', 'amount', 'measurement_unit')
+CHUNK_SIZE = 500
+
+
+class Echo:
+    """Буфер для csv.writer, возвращающий записанную строку."""
+
+    def write(self, value):
+        return value
+
+
+def get_ingredients(user):
+    """Суммы ингредиентов из списка покупок, упорядоченные по названию."""
+    return ShoppingListItem.objects.filter(
+        user=user
+    ).order_by(
+        'ingredient__name', 'ingredient'
+    ).values_list(
+        'ingredient__name',
+        'amount',
+        'ingredient__measurement_unit',
+    )
+
+
+def stream_txt(rows):
+    separator = ''
+    for name, amount, unit in rows:
+        yield f'{separator}{name}, {amount} {unit}'
+        separator = '\n'
+
+
+def stream_csv(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(FIELDS)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def stream_json(rows):
+    yield '['
+    separator = ''
+    for row in rows:
+        yield separator + json.dumps(dict(zip(FIELDS, row)),
+                                     ensure_ascii=False)
+        separator = ','
+    yield ']'
+
+
+STREAMERS = {
+    'txt': stream_txt,
+    'csv': stream_csv,
+    'json': stream_json,
+}
+
+
+def stream_shopping_list(user, format):
+    """Генератор выгрузки списка покупок в формате format.
+
+    Под ASGI Django читает потоковый ответ в цикле событий, где запросы
+    к БД запрещены, поэтому строки выбираются заранее.
+    """
+    rows = get_ingredients(user)
+    if settings.ASYNC_VIEWS:
+        rows = list(rows)
+    else:
+        rows = rows.iterator(chunk_size=CHUNK_SIZE)
+    return STREAMERS[format](rows)
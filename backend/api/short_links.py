@@ -0,0 +1,87 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.shortcuts import redirect
+from django.utils import baseconv
+from django.utils.cache import patch_cache_control
+
+from recipes.models import Recipe
+
+ALPHABET = frozenset(baseconv.BASE64_ALPHABET)
+# Больше id не бывает: такие ссылки не ищутся в БД.
+MAX_RECIPE_ID = 2 ** 63 - 1
+INVALID_SHORT_LINK = 'Недопустимые символы в короткой ссылке.'
+RECIPE_NOT_FOUND = 'Рецепт не найден.'
+
+
+def encode_short_link(recipe_id):
+    return baseconv.base64.encode(recipe_id)
+
+
+def decode_short_link(encoded_id):
+    """Возвращает id рецепта из короткой ссылки или None."""
+    if not ALPHABET.issuperset(encoded_id):
+        return None
+    return baseconv.base64.decode(encoded_id)
+
+
+def short_link_redirect(recipe_id):
+    response = redirect(f'/recipes/{recipe_id}/',)
+    patch_cache_control(
+        response, public=True, max_age=settings.SHORT_LINK_MAX_AGE
+    )
+    return response
+
+
+class RecipeLinkCache:
+    """LRU-кэш id существующих рецептов для коротких ссылок.
+
+    Переходы по популярной ссылке не обращаются к БД. Удаление рецепта
+    убирает его id из кэша процесса, в котором оно произошло; другие
+    процессы перепроверяют id в БД не позже чем через
+    SHORT_LINK_CACHE_TTL секунд после его добавления в кэш.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # id рецепта → время добавления.
+        self._ids = OrderedDict()
+
+    def __contains__(self, recipe_id):
+        with self._lock:
+            added_at = self._ids.get(recipe_id)
+            if added_at is None:
+                return False
+            ttl = settings.SHORT_LINK_CACHE_TTL
+            if ttl and time.monotonic() - added_at > ttl:
+                del self._ids[recipe_id]
+                return False
+            self._ids.move_to_end(recipe_id)
+            return True
+
+    def add(self, recipe_id):
+        with self._lock:
+            self._ids[recipe_id] = time.monotonic()
+            self._ids.move_to_end(recipe_id)
+            while len(self._ids) > settings.SHORT_LINK_CACHE_SIZE:
+                self._ids.popitem(last=False)
+
+    def discard(self, recipe_id):
+        with self._lock:
+            self._ids.pop(recipe_id, None)
+
+    def exists(self, recipe_id):
+        """Есть ли рецепт; в БД проверяются только id не из кэша."""
+        if recipe_id in self:
+            return True
+        if recipe_id > MAX_RECIPE_ID:
+            return False
+        if Recipe.objects.filter(pk=recipe_id).exists():
+            self.add(recipe_id)
+            return True
+        return False
+
+
+recipe_links = RecipeLinkCache()
@@ -0,0 +1,80 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from api.ingredient_index import ingredient_index
+from api.pantry_index import pantry_index
+from api.short_links import recipe_links
+from api.tag_registry import tag_registry
+from recipes.models import (
+    Favorite,
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    ShoppingCart,
+    Tag,
+    Version,
+)
+from users.models import Follow
+
+User = get_user_model()
+
+
+def bump_version(key):
+    transaction.on_commit(lambda: Version.objects.bump(key))
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def invalidate_ingredient_index(sender, **kwargs):
+    ingredient_index.invalidate()
+    bump_version('ingredients')
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+@receiver((post_save, post_delete), sender=RecipeIngredient)
+def bump_recipes_version(sender, **kwargs):
+    bump_version('recipes')
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+@receiver((post_save, post_delete), sender=RecipeIngredient)
+def refresh_pantry_index(sender, instance, **kwargs):
+    recipe_id = instance.pk if sender is Recipe else instance.recipe_id
+    transaction.on_commit(lambda: pantry_index.refresh([recipe_id]))
+
+
+@receiver(post_delete, sender=Recipe)
+def forget_recipe_link(sender, instance, **kwargs):
+    recipe_id = instance.pk
+    transaction.on_commit(lambda: recipe_links.discard(recipe_id))
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def bump_recipe_tags_version(sender, action, **kwargs):
+    if action.startswith('post_'):
+        bump_version('recipes')
+
+
+@receiver((post_save, post_delete), sender=Tag)
+def invalidate_tag_registry(sender, **kwargs):
+    tag_registry.invalidate()
+    bump_version('tags')
+
+
+@receiver((post_save, post_delete), sender=User)
+def bump_users_version(sender, update_fields=None, **kwargs):
+    if update_fields and set(update_fields) == {'last_login'}:
+        return
+    bump_version('users')
+
+
+@receiver((post_save, post_delete), sender=Favorite)
+@receiver((post_save, post_delete), sender=ShoppingCart)
+def bump_user_version(sender, instance, **kwargs):
+    bump_version(f'user:{instance.user_id}')
+
+
+@receiver((post_save, post_delete), sender=Follow)
+def bump_follower_version(sender, instance, **kwargs):
+    bump_version(f'user:{instance.follower_id}')
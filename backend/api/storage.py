@@ -0,0 +1,42 @@
+import os
+import re
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+CONTENT_HASH_NAME = re.compile(r'^[0-9a-f]{64}\.\w+$')
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """Файловое хранилище, не дублирующее файлы с хешем в имени.
+
+    Файл, названный хешем содержимого, сохраняется один раз: повторная
+    загрузка того же содержимого возвращает уже существующее имя.
+    Остальные файлы сохраняются как в FileSystemStorage.
+    """
+
+    def is_content_addressed(self, name):
+        return bool(CONTENT_HASH_NAME.match(os.path.basename(name)))
+
+    def get_available_name(self, name, max_length=None):
+        if self.is_content_addressed(name):
+            return name
+        return super().get_available_name(name, max_length)
+
+    def _save(self, name, content):
+        if not self.is_content_addressed(name):
+            return super()._save(name, content)
+        if self.exists(name):
+            return name
+        full_path = self.path(name)
+        directory = os.path.dirname(full_path)
+        os.makedirs(directory, exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=directory, delete=False) as file:
+            for chunk in content.chunks():
+                file.write(chunk)
+        os.replace(file.name, full_path)
+        if self.file_permissions_mode is not None:
+            os.chmod(full_path, self.file_permissions_mode)
+        return name
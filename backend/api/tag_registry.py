@@ -0,0 +1,43 @@
+import hashlib
+import json
+from typing import NamedTuple
+
+from api.process_cache import ProcessCache
+from recipes.models import Tag
+
+
+class TagCatalog(NamedTuple):
+    tags: list
+    by_id: dict
+    ids_by_slug: dict
+    etag: str
+
+
+class TagRegistry(ProcessCache):
+    """Каталог тегов в памяти процесса.
+
+    Отдаёт список тегов и переводит слаги в id без запросов к БД.
+    """
+
+    ttl_setting = 'TAG_REGISTRY_TTL'
+
+    def load(self):
+        tags = list(Tag.objects.order_by('id').values('id', 'name', 'slug'))
+        return TagCatalog(
+            tags=tags,
+            by_id={tag['id']: tag for tag in tags},
+            ids_by_slug={tag['slug']: tag['id'] for tag in tags},
+            etag=hashlib.md5(
+                json.dumps(tags, sort_keys=True).encode()
+            ).hexdigest(),
+        )
+
+    def choices(self):
+        return [(tag['slug'], tag['name']) for tag in self.get().tags]
+
+    def ids_for(self, slugs):
+        ids_by_slug = self.get().ids_by_slug
+        return [ids_by_slug[slug] for slug in slugs if slug in ids_by_slug]
+
+
+tag_registry = TagRegistry()
@@ -1,6 +1,8 @@
+from django.conf import settings
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
+from api.async_views import asyncify_routes
 from api.views import (
     TagsViewSet, IngredientsViewSet, RecipesViewSet, CustomUserViewSet
 )
@@ -12,6 +14,10 @@ router.register(r'tags', TagsViewSet)
 router.register(r'ingredients', IngredientsViewSet)
 router.register(r'recipes', RecipesViewSet)
 
+router_urls = router.urls
+if settings.ASYNC_VIEWS:
+    router_urls = asyncify_routes(router_urls)
+
 urlpatterns = [
-    path('api/', include(router.urls))
+    path('api/', include(router_urls))
 ]
@@ -1,52 +1,121 @@
+from functools import wraps
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db.models import Sum
-from django.http import HttpResponse
-from django.shortcuts import get_object_or_404, redirect
+from django.db import transaction
+from django.db.models import BooleanField, Value
+from django.http import StreamingHttpResponse
+from django.shortcuts import get_object_or_404
 from djoser.views import UserViewSet
 from django.urls import reverse
-from django.utils import baseconv
+from django.utils.cache import patch_cache_control
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import status, viewsets, filters
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.pagination import LimitOffsetPagination
 from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from api.filters import RecipeFilter
-from api.pagination import RecipePagination
+from api.conditional import conditional
+from api.fast_serializers import RECIPE_ROW_FIELDS, RecipeRowsSerializer
+from api.filters import RecipeFilter, RecipeSearchFilter
+from api.ingredient_index import ingredient_index
+from api.metrics import TimedSerializerMixin
+from api.pagination import (
+    FeedPagination,
+    PantryPagination,
+    RecipePagination,
+)
+from api.pantry_index import pantry_index
 from api.permissions import IsAuthorOrReadOnly
+from api.renderers import CSVRenderer, PlainTextRenderer
 from api.serializers import (
     TagsSerializer,
     IngredientsSerializer,
     RecipesSerializer,
     CreateRecipesSerializer,
     ShortRecipeSerializer,
+    RecipeIdsSerializer,
+    PantrySerializer,
     CustomUserSerializer,
     FollowSerializer,
     CustomUserAvatarSerializer,
+    get_recipes_limit,
+)
+from api.shopping_list import get_ingredients, stream_shopping_list
+from api.signals import bump_version
+from api.short_links import (
+    INVALID_SHORT_LINK,
+    RECIPE_NOT_FOUND,
+    decode_short_link,
+    encode_short_link,
+    recipe_links,
+    short_link_redirect,
 )
+from api.tag_registry import tag_registry
+from recipes import user_lists
 from recipes.models import (
     Tag,
     Ingredient,
     Recipe,
     Favorite,
     ShoppingCart,
-    RecipeIngredient
 )
 from users.models import Follow
 
 User = get_user_model()
 
 
-class TagsViewSet(viewsets.ReadOnlyModelViewSet):
+def tag_catalog_etag(request, *args, **kwargs):
+    return tag_registry.get().etag
+
+
+def cache_tag_catalog(view):
+    """Отдаёт каталог тегов с ETag из памяти и долгим Cache-Control."""
+    conditional_view = condition(etag_func=tag_catalog_etag)(view)
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        response = conditional_view(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            patch_cache_control(
+                response, public=True, max_age=settings.TAGS_CACHE_MAX_AGE
+            )
+        return response
+    return wrapper
+
+
+@method_decorator(cache_tag_catalog, name='list')
+@method_decorator(cache_tag_catalog, name='retrieve')
+class TagsViewSet(TimedSerializerMixin, viewsets.ReadOnlyModelViewSet):
     """Вьюсет тега"""
     queryset = Tag.objects.all()
     serializer_class = TagsSerializer
     pagination_class = None
 
+    def list(self, request, *args, **kwargs):
+        return Response(tag_registry.get().tags)
 
-class IngredientsViewSet(viewsets.ReadOnlyModelViewSet):
+    def retrieve(self, request, pk=None, *args, **kwargs):
+        try:
+            return Response(tag_registry.get().by_id[int(pk)])
+        except (KeyError, ValueError):
+            raise NotFound
+
+
+def ingredients_etag(request, *args, **kwargs):
+    """ETag из индекса в памяти: условный запрос не обращается к БД."""
+    return ingredient_index.etag(request)
+
+
+@method_decorator(condition(etag_func=ingredients_etag), name='list')
+@method_decorator(condition(etag_func=ingredients_etag), name='retrieve')
+class IngredientsViewSet(TimedSerializerMixin, viewsets.ReadOnlyModelViewSet):
     """Вьюсет ингредиентов"""
     queryset = Ingredient.objects.all()
     serializer_class = IngredientsSerializer
@@ -55,44 +124,129 @@ class IngredientsViewSet(viewsets.ReadOnlyModelViewSet):
     filterset_fields = ('name',)
     search_fields = ('^name',)
 
+    def list(self, request, *args, **kwargs):
+        name = request.query_params.get('name')
+        if name:
+            return Response(ingredient_index.search(name))
+        return super().list(request, *args, **kwargs)
+
 
-class RecipesViewSet(viewsets.ModelViewSet):
+SHORT_RECIPE_FIELDS = ('id', 'name', 'image', 'cooking_time')
+
+RECIPE_VERSION_KEYS = ('recipes', 'tags', 'ingredients', 'users')
+
+
+@method_decorator(
+    conditional(*RECIPE_VERSION_KEYS, per_user=True), name='list'
+)
+@method_decorator(
+    conditional(*RECIPE_VERSION_KEYS, per_user=True), name='retrieve'
+)
+class RecipesViewSet(TimedSerializerMixin, viewsets.ModelViewSet):
     """Вьюсет рецептов"""
     queryset = Recipe.objects.all()
     pagination_class = RecipePagination
     permission_classes = (IsAuthorOrReadOnly,)
-    filter_backends = (DjangoFilterBackend, filters.SearchFilter)
+    filter_backends = (DjangoFilterBackend, RecipeSearchFilter)
     filterset_class = RecipeFilter
-    search_fields = ('tags',)
+
+    def use_fast_path(self):
+        return (
+            settings.FAST_RECIPE_SERIALIZER
+            and self.action in ('list', 'retrieve')
+        )
+
+    def get_queryset(self):
+        queryset = Recipe.objects.for_user(self.request.user)
+        if self.use_fast_path():
+            return queryset.prefetch_related(None).values(*RECIPE_ROW_FIELDS)
+        return queryset
 
     def get_serializer_class(self):
         if self.action == 'create' or self.action == 'partial_update':
             return CreateRecipesSerializer
+        if self.use_fast_path():
+            return RecipeRowsSerializer
         return RecipesSerializer
 
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
+    def get_recipe_id(self, pk):
+        """Id существующего рецепта без запроса к базе при попадании
+        в кэш коротких ссылок."""
+        try:
+            recipe_id = int(pk)
+        except ValueError:
+            raise NotFound(RECIPE_NOT_FOUND)
+        if not recipe_links.exists(recipe_id):
+            raise NotFound(RECIPE_NOT_FOUND)
+        return recipe_id
+
     def add_or_delete(self, model, pk, message, request):
+        """Добавление или удаление одного рецепта.
+
+        Как и пакетный вариант, пишет одним INSERT или DELETE через
+        user_lists.change_many: сигналы не срабатывают.
+        """
         user = request.user
-        recipe = get_object_or_404(Recipe, id=pk)
-        related_recipe = model.objects.filter(user=user, recipe=recipe)
 
         if request.method == 'POST':
-            if related_recipe.exists():
+            recipe = get_object_or_404(
+                Recipe.objects.only(*SHORT_RECIPE_FIELDS), id=pk
+            )
+            with transaction.atomic():
+                added = user_lists.change_many(model, user.id, [recipe.id], 1)
+                if added:
+                    bump_version(f'user:{user.id}')
+            if not added:
                 return Response(
                     message,
                     status=status.HTTP_400_BAD_REQUEST
                 )
-            model.objects.create(user=user, recipe=recipe)
             serializer = ShortRecipeSerializer(recipe)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
 
-        if related_recipe.exists():
-            related_recipe.delete()
+        with transaction.atomic():
+            deleted = user_lists.change_many(model, user.id, [pk], -1)
+            if deleted:
+                bump_version(f'user:{user.id}')
+        if deleted:
             return Response(status=status.HTTP_204_NO_CONTENT)
+        get_object_or_404(Recipe, id=pk)
         return Response(status=status.HTTP_400_BAD_REQUEST)
 
+    def add_or_delete_many(self, model, request):
+        """Пакетное идемпотентное добавление или удаление рецептов.
+
+        Одна вставка с пропуском существующих строк или один DELETE;
+        счётчики и список покупок обновляет user_lists.change_many.
+        """
+        serializer = RecipeIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        recipe_ids = serializer.validated_data['recipes']
+        user = request.user
+
+        with transaction.atomic():
+            sign = -1
+            if request.method == 'POST':
+                sign = 1
+                recipes = list(Recipe.objects.filter(
+                    id__in=recipe_ids
+                ).only(*SHORT_RECIPE_FIELDS))
+                missing = set(recipe_ids) - {recipe.id for recipe in recipes}
+                if missing:
+                    raise ValidationError({'recipes': [
+                        f'Рецептов с id {sorted(missing)} не существует.'
+                    ]})
+            if user_lists.change_many(model, user.id, recipe_ids, sign):
+                bump_version(f'user:{user.id}')
+
+        if request.method == 'POST':
+            serializer = ShortRecipeSerializer(recipes, many=True)
+            return Response(serializer.data, status=status.HTTP_201_CREATED)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
     @action(
         detail=True,
         methods=('post', 'delete'),
@@ -124,42 +278,113 @@ class RecipesViewSet(viewsets.ModelViewSet):
 
     @action(
         detail=False,
-        methods=['get'],
+        methods=('post', 'delete'),
+        url_path='favorite',
+        url_name='favorite-many',
+        permission_classes=(IsAuthenticated,),
+    )
+    def favorite_many(self, request):
+        """Добавление и удаление нескольких рецептов в избранном."""
 
+        return self.add_or_delete_many(Favorite, request)
+
+    @action(
+        detail=False,
+        methods=('post', 'delete'),
+        url_path='shopping_cart',
+        url_name='shopping-cart-many',
+        permission_classes=(IsAuthenticated,),
     )
-    def download_shopping_cart(self, request):
-        user = request.user
-        recipes = ShoppingCart.objects.filter(user=user).values_list('recipe')
-        ingredients = (
-            RecipeIngredient.objects.filter(
-                recipe__in=recipes
-            ).values(
-                'ingredient'
-            ).annotate(
-                quantity=Sum('amount')
-            ).values_list(
-                'ingredient__name',
-                'quantity',
-                'ingredient__measurement_unit',
-            )
+    def shopping_cart_many(self, request):
+        """Добавление и удаление нескольких рецептов в списке покупок."""
+
+        return self.add_or_delete_many(ShoppingCart, request)
+
+    @action(
+        detail=False,
+        methods=('get',),
+        permission_classes=(IsAuthenticated,),
+        pagination_class=FeedPagination,
+    )
+    def feed(self, request):
+        """Лента рецептов авторов, на которых подписан пользователь."""
+
+        recipe_ids = self.paginator.paginate_feed(request.user, request)
+        recipes = self.get_queryset().in_bulk(recipe_ids)
+        serializer = RecipesSerializer(
+            [recipes[pk] for pk in recipe_ids if pk in recipes],
+            many=True,
+            context=self.get_serializer_context(),
         )
-        shopping_list = []
-        for ingredient in ingredients:
-            name, value, unit = ingredient
-            shopping_list.append(
-                f'{name}, {value} {unit}'
-            )
-        shopping_list = '\n'.join(shopping_list)
+        return self.paginator.get_paginated_response(serializer.data)
 
-        filename = 'Shopping_list.txt'
-        response = HttpResponse(
-            shopping_list,
-            content_type='text/txt'
+    @method_decorator(conditional('recipes', per_user=True))
+    @action(
+        detail=False,
+        methods=('get',),
+        url_path='shopping_cart/totals',
+        url_name='shopping-cart-totals',
+        permission_classes=(IsAuthenticated,),
+    )
+    def shopping_cart_totals(self, request):
+        """Текущие суммы ингредиентов в списке покупок."""
+
+        return Response([
+            {'name': name, 'amount': amount, 'measurement_unit': unit}
+            for name, amount, unit in get_ingredients(request.user)
+        ])
+
+    @action(
+        detail=False,
+        methods=['get'],
+        permission_classes=(IsAuthenticated,),
+        renderer_classes=(PlainTextRenderer, CSVRenderer, JSONRenderer),
+    )
+    def download_shopping_cart(self, request):
+        """Потоковая выгрузка списка покупок (?format=txt|csv|json)."""
+        renderer = request.accepted_renderer
+        response = StreamingHttpResponse(
+            stream_shopping_list(request.user, renderer.format),
+            content_type=f'{renderer.media_type}; charset=utf-8'
         )
+        filename = f'Shopping_list.{renderer.format}'
         response['Content-Disposition'] = f'attachment; filename={filename}'
 
         return response
 
+    @action(
+        detail=False,
+        methods=('get',),
+        pagination_class=PantryPagination,
+    )
+    def pantry(self, request):
+        """Рецепты из имеющихся продуктов (?ingredients=1&ingredients=2):
+        сначала те, для которых не хватает меньше ингредиентов."""
+
+        serializer = PantrySerializer(data={
+            'ingredients': request.query_params.getlist('ingredients')
+        })
+        serializer.is_valid(raise_exception=True)
+        recipe_ids = self.paginate_queryset(
+            pantry_index.search(serializer.validated_data['ingredients'])
+        )
+        recipes = Recipe.objects.only(*SHORT_RECIPE_FIELDS).in_bulk(
+            recipe_ids
+        )
+        serializer = ShortRecipeSerializer(
+            [recipes[pk] for pk in recipe_ids if pk in recipes], many=True
+        )
+        return self.get_paginated_response(serializer.data)
+
+    @action(detail=True, methods=('get',))
+    def similar(self, request, pk=None):
+        """Рецепты с похожим набором ингредиентов."""
+
+        recipes = Recipe.objects.only(*SHORT_RECIPE_FIELDS).filter(
+            similar_to__recipe_id=self.get_recipe_id(pk)
+        ).order_by('-similar_to__score', 'id')
+        return Response(ShortRecipeSerializer(recipes, many=True).data)
+
     @action(
         methods=['get'],
         detail=True,
@@ -167,8 +392,8 @@ class RecipesViewSet(viewsets.ModelViewSet):
         url_name='get-link',
     )
     def get_link(self, request, pk=None):
-        recipe = self.get_object()
-        encode_id = baseconv.base64.encode(recipe.id)
+        recipe_id = self.get_recipe_id(pk)
+        encode_id = encode_short_link(recipe_id)
         short_link = request.build_absolute_uri(
             reverse('shortlink', kwargs={'encoded_id': encode_id})
         )
@@ -178,16 +403,18 @@ class RecipesViewSet(viewsets.ModelViewSet):
 class ShortLinkView(APIView):
 
     def get(self, request, encoded_id):
-        if not set(encoded_id).issubset(set(baseconv.BASE64_ALPHABET)):
+        recipe_id = decode_short_link(encoded_id)
+        if recipe_id is None:
             return Response(
-                {'error': 'Недопустимые символы в короткой ссылке.'},
+                {'error': INVALID_SHORT_LINK},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        recipe_id = baseconv.base64.decode(encoded_id)
-        return redirect(f'/recipes/{recipe_id}/',)
+        if not recipe_links.exists(recipe_id):
+            raise NotFound(RECIPE_NOT_FOUND)
+        return short_link_redirect(recipe_id)
 
 
-class CustomUserViewSet(UserViewSet):
+class CustomUserViewSet(TimedSerializerMixin, UserViewSet):
     """Вьюсет пользователя"""
 
     serializer_class = CustomUserSerializer
@@ -221,6 +448,7 @@ class CustomUserViewSet(UserViewSet):
         user = request.user
         author = get_object_or_404(User, id=id)
         if request.method == 'POST':
+            get_recipes_limit(request)
             if Follow.objects.filter(follower=user, author=author).exists():
                 return Response(
                     'Вы уже подписаны на этого автора',
@@ -231,11 +459,13 @@ class CustomUserViewSet(UserViewSet):
                     'Невозможно подписаться на самого себя',
                     status=status.HTTP_400_BAD_REQUEST
                 )
+            with transaction.atomic():
+                Follow.objects.create(follower=user, author=author)
+            author.refresh_from_db(fields=['followers_count'])
             serializer = FollowSerializer(
                 author,
                 context={"request": request, }
             )
-            Follow.objects.create(follower=user, author=author)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
 
         if not Follow.objects.filter(follower=user, author=author).exists():
@@ -253,8 +483,19 @@ class CustomUserViewSet(UserViewSet):
     )
     def subscriptions(self, request):
         user = request.user
-        queryset = User.objects.filter(author__follower=user)
+        limit = get_recipes_limit(request)
+        queryset = User.objects.filter(author__follower=user).annotate(
+            is_subscribed=Value(True, output_field=BooleanField()),
+        ).order_by('author__id')
         pages = self.paginate_queryset(queryset)
+        recipes = Recipe.objects.filter(author__in=pages)
+        if limit:
+            recipes = recipes.first_per_author(limit)
+        previews = {author.id: [] for author in pages}
+        for recipe in recipes:
+            previews[recipe.author_id].append(recipe)
+        for author in pages:
+            author.recipes_preview = previews[author.id]
         serializer = FollowSerializer(
             pages, many=True, context={"request": request}
         )
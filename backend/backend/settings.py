@@ -30,6 +30,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.middleware.RequestMetricsMiddleware',
+    'api.middleware.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -70,6 +72,33 @@ DATABASES = {
     }
 }
 
+# Реплика для чтения: безопасные запросы к API идут на неё, кроме
+# REPLICA_PIN_SECONDS секунд после записи от того же клиента.
+if os.getenv('DB_REPLICA_HOST'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'HOST': os.getenv('DB_REPLICA_HOST'),
+        'PORT': os.getenv('DB_REPLICA_PORT', DATABASES['default']['PORT']),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['api.db_router.PrimaryReplicaRouter']
+
+REPLICA_PIN_SECONDS = int(os.getenv('REPLICA_PIN_SECONDS', 10))
+
+# С репликой кэш должен быть общим для всех воркеров: в нём хранятся
+# отметки о недавней записи пользователя. Например, CACHE_BACKEND=
+# django.core.cache.backends.db.DatabaseCache и CACHE_LOCATION=cache_table
+# (таблица создаётся командой createcachetable).
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+}
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -114,6 +143,17 @@ REST_FRAMEWORK = {
         'rest_framework.authentication.TokenAuthentication',
     ],
 
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+
+    'DEFAULT_PARSER_CLASSES': [
+        'api.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.LimitOffsetPagination',
     'PAGE_SIZE': 6,
     'SEARCH_PARAM': 'name',
@@ -136,3 +176,47 @@ DJOSER = {
 MEDIA_URL = '/media/'
 
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
+INGREDIENT_INDEX_TTL = int(os.getenv('INGREDIENT_INDEX_TTL', 300))
+
+PANTRY_INDEX_TTL = int(os.getenv('PANTRY_INDEX_TTL', 300))
+
+# wsgi — синхронные воркеры gunicorn, asgi — воркеры uvicorn и асинхронные
+# представления для горячих чтений.
+SERVER_MODE = os.getenv('SERVER_MODE', 'wsgi')
+
+ASYNC_VIEWS = SERVER_MODE == 'asgi'
+
+TAG_REGISTRY_TTL = int(os.getenv('TAG_REGISTRY_TTL', 300))
+
+TAGS_CACHE_MAX_AGE = int(os.getenv('TAGS_CACHE_MAX_AGE', 3600))
+
+SHORT_LINK_CACHE_SIZE = int(os.getenv('SHORT_LINK_CACHE_SIZE', 10000))
+
+# Через столько секунд другие процессы замечают удалённый рецепт.
+SHORT_LINK_CACHE_TTL = int(os.getenv('SHORT_LINK_CACHE_TTL', 60))
+
+SHORT_LINK_MAX_AGE = int(os.getenv('SHORT_LINK_MAX_AGE', 3600))
+
+# Лишние записи удаляет rebuild_feeds --trim, запускаемая периодически.
+FEED_MAX_LENGTH = int(os.getenv('FEED_MAX_LENGTH', 500))
+
+# Авторам с большим числом подписчиков лента не рассылается при
+# публикации: их рецепты подмешиваются при чтении.
+FEED_FANOUT_MAX_FOLLOWERS = int(os.getenv('FEED_FANOUT_MAX_FOLLOWERS', 1000))
+
+SIMILAR_RECIPES_COUNT = int(os.getenv('SIMILAR_RECIPES_COUNT', 10))
+
+# Список и страница рецепта собираются из строк values() без вложенных
+# сериализаторов (api.fast_serializers).
+FAST_RECIPE_SERIALIZER = (
+    os.getenv('FAST_RECIPE_SERIALIZER', 'False') == 'True'
+)
+
+# Каталог, через который воркеры складывают метрики /metrics; без него
+# каждый воркер отдаёт только свои ряды с меткой pid.
+METRICS_DIR = os.getenv('METRICS_DIR', '')
+
+DEFAULT_FILE_STORAGE = 'api.storage.ContentAddressedStorage'
+
+BASE64_IMAGE_MAX_SIZE = int(os.getenv('BASE64_IMAGE_MAX_SIZE', 10 * 1024 * 1024))
@@ -0,0 +1,23 @@
+"""Настройки для локальных нагрузочных тестов на SQLite.
+
+Запуск: DJANGO_SETTINGS_MODULE=backend.settings_benchmark
+"""
+import os
+
+os.environ.setdefault('SETTINGS_SECRET_KEY', 'benchmark')
+os.environ.setdefault('ALLOWED_HOSTS', '127.0.0.1,localhost')
+
+from backend.settings import *  # noqa: E402,F401,F403
+from backend.settings import BASE_DIR  # noqa: E402
+
+DEBUG = False
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.getenv(
+            'BENCHMARK_DB', os.path.join(BASE_DIR, 'benchmark.sqlite3')
+        ),
+        'OPTIONS': {'timeout': 30},
+    }
+}
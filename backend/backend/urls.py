@@ -3,6 +3,8 @@ from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import include, path
 
+from api.async_views import short_link
+from api.metrics import metrics
 from api.views import ShortLinkView
 
 urlpatterns = [
@@ -10,7 +12,12 @@ urlpatterns = [
     path('', include('api.urls')),
     path('api/', include('djoser.urls')),
     path('api/auth/', include('djoser.urls.authtoken')),
-    path('s/<str:encoded_id>/', ShortLinkView.as_view(), name='shortlink'),
+    path(
+        's/<str:encoded_id>/',
+        short_link if settings.ASYNC_VIEWS else ShortLinkView.as_view(),
+        name='shortlink'
+    ),
+    path('metrics', metrics, name='metrics'),
 ]
 
 if settings.DEBUG:
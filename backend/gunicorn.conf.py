@@ -0,0 +1,20 @@
+import os
+
+bind = '0.0.0.0:8000'
+
+# SERVER_MODE=asgi запускает воркеры uvicorn: медленный клиент или запрос
+# не занимает весь воркер, и один процесс обслуживает больше соединений.
+if os.getenv('SERVER_MODE', 'wsgi') == 'asgi':
+    wsgi_app = 'backend.asgi:application'
+    worker_class = 'uvicorn.workers.UvicornWorker'
+else:
+    wsgi_app = 'backend.wsgi:application'
+
+
+def on_starting(server):
+    """Метрики прошлого запуска в METRICS_DIR больше не нужны."""
+    directory = os.getenv('METRICS_DIR')
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+        for name in os.listdir(directory):
+            os.remove(os.path.join(directory, name))
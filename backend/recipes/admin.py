@@ -1,12 +1,76 @@
 from django.contrib import admin
 
+from .admin_actions import export_csv
 from .models import (
     Ingredient, Tag, Recipe, RecipeIngredient, Favorite, ShoppingCart
 )
 
-admin.site.register(Ingredient)
-admin.site.register(Tag)
-admin.site.register(Recipe)
-admin.site.register(RecipeIngredient)
-admin.site.register(Favorite)
-admin.site.register(ShoppingCart)
+
+@admin.register(Ingredient)
+class IngredientAdmin(admin.ModelAdmin):
+    list_display = ('name', 'measurement_unit')
+    # Поиск по началу названия использует индекс по UPPER(name).
+    search_fields = ('^name',)
+    ordering = ('name', 'id')
+    actions = (export_csv('id', 'name', 'measurement_unit'),)
+
+
+@admin.register(Tag)
+class TagAdmin(admin.ModelAdmin):
+    list_display = ('name', 'slug')
+    search_fields = ('name', 'slug')
+
+
+class RecipeIngredientInline(admin.TabularInline):
+    model = RecipeIngredient
+    autocomplete_fields = ('ingredient',)
+    extra = 0
+    min_num = 1
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('ingredient')
+
+
+@admin.register(Recipe)
+class RecipeAdmin(admin.ModelAdmin):
+    list_display = (
+        'name', 'author', 'cooking_time', 'pub_date', 'favorites_count'
+    )
+    list_select_related = ('author',)
+    list_filter = ('tags',)
+    search_fields = ('name',)
+    autocomplete_fields = ('author',)
+    filter_horizontal = ('tags',)
+    readonly_fields = ('favorites_count', 'in_carts_count')
+    inlines = (RecipeIngredientInline,)
+    show_full_result_count = False
+    actions = (export_csv(
+        'id', 'name', 'author__username', 'cooking_time', 'pub_date',
+        'favorites_count', 'in_carts_count'
+    ),)
+
+    def get_search_results(self, request, queryset, search_term):
+        """Поиск тем же индексированным запросом, что и в API."""
+        if not search_term.strip():
+            return queryset, False
+        return queryset.search(search_term), False
+
+
+@admin.register(RecipeIngredient)
+class RecipeIngredientAdmin(admin.ModelAdmin):
+    list_display = ('recipe', 'ingredient', 'amount')
+    list_select_related = ('recipe', 'ingredient')
+    autocomplete_fields = ('recipe', 'ingredient')
+    show_full_result_count = False
+
+
+class UserRecipeAdmin(admin.ModelAdmin):
+    list_display = ('user', 'recipe')
+    list_select_related = ('user', 'recipe')
+    autocomplete_fields = ('user', 'recipe')
+    show_full_result_count = False
+    actions = (export_csv('user__username', 'recipe__id', 'recipe__name'),)
+
+
+admin.site.register(Favorite, UserRecipeAdmin)
+admin.site.register(ShoppingCart, UserRecipeAdmin)
@@ -0,0 +1,62 @@
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from recipes.models import Version
+
+# Счётчики, которые выводятся в ответах с условными запросами
+# (api.conditional): их изменение меняет версию данных модели.
+# Остальные версию не трогают, чтобы не сбрасывать ETag списка рецептов
+# при каждой подписке или изменении корзины: followers_count выводится
+# только в подписках, а они без условных запросов.
+VERSIONED_COUNTERS = {
+    ('recipes.recipe', 'favorites_count'): 'recipes',
+}
+
+
+def bump_counter_version(model, field):
+    key = VERSIONED_COUNTERS.get((model._meta.label_lower, field))
+    if key:
+        transaction.on_commit(lambda: Version.objects.bump(key))
+
+
+def change_counter(model, pk, field, delta):
+    """Атомарно изменяет счётчик одной строки, не опуская его ниже нуля."""
+    change_counters(model, [pk], field, delta)
+
+
+def change_counters(model, pks, field, delta):
+    """То же для строк pks одним запросом UPDATE."""
+    model.objects.filter(pk__in=pks).update(
+        **{field: Greatest(F(field) + delta, 0)}
+    )
+    bump_counter_version(model, field)
+
+
+def count_of(model, field):
+    """Подзапрос: число строк model, ссылающихся на внешнюю строку."""
+    return Coalesce(Subquery(
+        model.objects.filter(
+            **{field: OuterRef('pk')}
+        ).order_by().values(field).annotate(
+            total=Count('pk')
+        ).values('total')
+    ), 0)
+
+
+def recount(recipe_model, user_model, favorite_model, cart_model,
+            follow_model):
+    """Пересчитывает все счётчики двумя запросами UPDATE.
+
+    Модели передаются явно, чтобы функцию можно было вызвать
+    из миграции с историческими моделями.
+    """
+    recipe_model.objects.update(
+        favorites_count=count_of(favorite_model, 'recipe'),
+        in_carts_count=count_of(cart_model, 'recipe'),
+    )
+    user_model.objects.update(
+        recipes_count=count_of(recipe_model, 'author'),
+        followers_count=count_of(follow_model, 'author'),
+        following_count=count_of(follow_model, 'follower'),
+    )
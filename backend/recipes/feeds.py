@@ -0,0 +1,149 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.models import Count
+
+from recipes.models import FeedEntry, Recipe, before_position
+from users.models import Follow
+
+User = get_user_model()
+
+FEED = FeedEntry._meta.db_table
+FOLLOW = Follow._meta.db_table
+RECIPE = Recipe._meta.db_table
+USER = User._meta.db_table
+
+# Подписчики автора, если у него не больше FEED_FANOUT_MAX_FOLLOWERS
+# подписчиков; рецепты популярных авторов подмешиваются при чтении.
+FANOUT_FOLLOWERS = (
+    f'SELECT follow.follower_id FROM {FOLLOW} follow '
+    f'JOIN {USER} author ON author.id = follow.author_id '
+    'WHERE follow.author_id = %s AND author.followers_count <= %s'
+)
+
+
+def execute(sql, params):
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+
+
+def users_filter(column, user_ids):
+    if user_ids is None:
+        return '', []
+    user_ids = list(user_ids)
+    return (
+        f'AND {column} IN ({", ".join(["%s"] * len(user_ids))})', user_ids
+    )
+
+
+def fan_out(recipe):
+    """Добавляет новый рецепт в ленты подписчиков автора.
+
+    Ленты не обрезаются здесь, чтобы не читать их при каждой публикации:
+    лишние записи удаляет trim() (rebuild_feeds --trim), а чтение и так
+    берёт только начало ленты по индексу.
+    """
+    execute(
+        f'INSERT INTO {FEED} (user_id, recipe_id, pub_date) '
+        f'SELECT follower_id, %s, %s FROM ({FANOUT_FOLLOWERS}) AS followers '
+        'WHERE true ON CONFLICT (user_id, recipe_id) DO NOTHING',
+        (recipe.id, recipe.pub_date, recipe.author_id,
+         settings.FEED_FANOUT_MAX_FOLLOWERS)
+    )
+
+
+def backfill(author_id):
+    """Добавляет последние рецепты автора в ленты его подписчиков.
+
+    Нужно, когда подписчиков стало не больше FEED_FANOUT_MAX_FOLLOWERS:
+    рецепты автора перестают подмешиваться при чтении, а старых записей
+    в лентах нет.
+    """
+    execute(
+        f'INSERT INTO {FEED} (user_id, recipe_id, pub_date) '
+        'SELECT follow.follower_id, recipe.id, recipe.pub_date '
+        f'FROM {FOLLOW} follow CROSS JOIN ('
+        f'SELECT id, pub_date FROM {RECIPE} WHERE author_id = %s '
+        'ORDER BY pub_date DESC, id DESC LIMIT %s'
+        ') AS recipe WHERE follow.author_id = %s '
+        'ON CONFLICT (user_id, recipe_id) DO NOTHING',
+        (author_id, settings.FEED_MAX_LENGTH, author_id)
+    )
+
+
+def trim(user_ids=None):
+    """Оставляет в лентах FEED_MAX_LENGTH последних записей.
+
+    Для каждой слишком длинной ленты находится N-я запись и одним
+    DELETE по индексу удаляется всё, что старше неё.
+    """
+    limit = settings.FEED_MAX_LENGTH
+    entries = FeedEntry.objects.all()
+    if user_ids is not None:
+        entries = entries.filter(user_id__in=user_ids)
+    overfull = entries.values('user_id').annotate(
+        total=Count('id')
+    ).filter(total__gt=limit).values_list('user_id', flat=True)
+    trimmed = 0
+    for user_id in list(overfull):
+        feed = FeedEntry.objects.filter(user_id=user_id)
+        last = feed.order_by('-pub_date', '-recipe_id').values_list(
+            'pub_date', 'recipe_id'
+        )[limit - 1]
+        deleted, _ = feed.filter(
+            before_position(*last, id_field='recipe_id')
+        ).delete()
+        trimmed += deleted
+    return trimmed
+
+
+def rebuild(user_ids=None):
+    """Заново собирает ленты всех пользователей или user_ids."""
+    if user_ids is not None:
+        user_ids = list(user_ids)
+        if not user_ids:
+            return
+        FeedEntry.objects.filter(user_id__in=user_ids).delete()
+    else:
+        FeedEntry.objects.all().delete()
+    where, params = users_filter('follow.follower_id', user_ids)
+    execute(
+        f'INSERT INTO {FEED} (user_id, recipe_id, pub_date) '
+        'SELECT user_id, recipe_id, pub_date FROM ('
+        'SELECT follow.follower_id AS user_id, recipe.id AS recipe_id, '
+        'recipe.pub_date, ROW_NUMBER() OVER ('
+        'PARTITION BY follow.follower_id '
+        'ORDER BY recipe.pub_date DESC, recipe.id DESC'
+        f') AS position FROM {FOLLOW} follow '
+        f'JOIN {USER} author ON author.id = follow.author_id '
+        f'JOIN {RECIPE} recipe ON recipe.author_id = follow.author_id '
+        f'WHERE author.followers_count <= %s {where}'
+        ') AS ranked WHERE position <= %s',
+        (settings.FEED_FANOUT_MAX_FOLLOWERS, *params, settings.FEED_MAX_LENGTH)
+    )
+
+
+def read(user_id, position, limit):
+    """Страница ленты: до limit пар (pub_date, id рецепта) после position.
+
+    Записи ленты выбираются одним проходом по индексу (user, pub_date);
+    рецепты популярных авторов, которым лента не рассылается, —
+    отдельным запросом по их рецептам.
+    """
+    entries = FeedEntry.objects.filter(user_id=user_id)
+    popular = Recipe.objects.filter(author__in=Follow.objects.filter(
+        follower_id=user_id,
+        author__followers_count__gt=settings.FEED_FANOUT_MAX_FOLLOWERS,
+    ).values('author_id'))
+    if position:
+        entries = entries.filter(
+            before_position(*position, id_field='recipe_id')
+        )
+        popular = popular.filter(before_position(*position))
+    rows = set(entries.order_by('-pub_date', '-recipe_id').values_list(
+        'pub_date', 'recipe_id'
+    )[:limit])
+    rows.update(popular.order_by('-pub_date', '-id').values_list(
+        'pub_date', 'id'
+    )[:limit])
+    return sorted(rows, reverse=True)[:limit]
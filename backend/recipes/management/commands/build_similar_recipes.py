@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes import similarity
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает похожие рецепты'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--changed', action='store_true',
+            help='Пересчитать только рецепты с изменёнными ингредиентами '
+                 'и зависящие от них'
+        )
+        parser.add_argument(
+            '--block-size', type=int, default=500,
+            help='Количество рецептов, сравниваемых со всеми за один раз'
+        )
+
+    def handle(self, *args, **options):
+        if options['block_size'] < 1:
+            raise CommandError('--block-size должен быть больше нуля.')
+        if options['changed']:
+            count = similarity.update(options['block_size'])
+        else:
+            count = similarity.rebuild(options['block_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Похожие рецепты пересчитаны для {count} рецептов.'
+        ))
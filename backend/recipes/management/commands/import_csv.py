@@ -1,34 +1,137 @@
 import csv
+import io
+import json
+from itertools import islice
+from pathlib import Path
 
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
 
-from recipes.models import Ingredient
+from recipes.models import Ingredient, Version
+
+NAME_MAX_LENGTH = Ingredient._meta.get_field('name').max_length
+UNIT_MAX_LENGTH = Ingredient._meta.get_field('measurement_unit').max_length
 
 
 class Command(BaseCommand):
-    help = 'Imports data from a CSV file into MyModel'
+    help = 'Загружает ингредиенты из CSV или JSON файла'
 
     def add_arguments(self, parser):
         parser.add_argument(
-            'csv_file', type=str, help='The path to the CSV file to import'
+            'path', type=str, help='Путь к CSV или JSON файлу'
+        )
+        parser.add_argument(
+            '--format', choices=('csv', 'json'),
+            help='Формат файла, по умолчанию определяется по расширению'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=5000,
+            help='Количество строк в одной пачке вставки'
+        )
+        parser.add_argument(
+            '--no-copy', action='store_true',
+            help='Не использовать COPY даже на PostgreSQL'
         )
 
-    def handle(self, *args, **kwargs):
-        path = kwargs['csv_file']
-        with open(path, "r", encoding='utf-8-sig') as csv_file:
-            reader = csv.reader(csv_file)
-
-            for row in reader:
-                name_csv = 0
-                unit_of_measurement_csv = 1
-                try:
-                    obj, created = Ingredient.objects.get_or_create(
-                        name=row[name_csv],
-                        measurement_unit=row[unit_of_measurement_csv],
+    def read_rows(self, path, file_format):
+        with open(path, encoding='utf-8-sig') as file:
+            if file_format == 'json':
+                for item in json.load(file):
+                    yield (
+                        (item.get('name'), item.get('measurement_unit'))
+                        if isinstance(item, dict) else None
                     )
-                    if not created:
-                        print(f"Ингредиент {obj} уже есть в базе данных.")
-                except Exception as err:
-                    print(f"Ошибка в строке {row}: {err}")
+            else:
+                yield from csv.reader(file)
+
+    def clean_rows(self, rows, stats):
+        """Отбрасывает некорректные строки и повторы внутри файла."""
+        seen = set()
+        for row in rows:
+            try:
+                name, unit, *_ = row
+                name, unit = name.strip(), unit.strip()
+            except (TypeError, ValueError, AttributeError):
+                name = unit = None
+            if (
+                not name or not unit
+                or len(name) > NAME_MAX_LENGTH
+                or len(unit) > UNIT_MAX_LENGTH
+            ):
+                stats['failed'] += 1
+                if self.verbosity > 1:
+                    self.stderr.write(f'Ошибка в строке {row}')
+                continue
+            if (name, unit) in seen:
+                stats['duplicates'] += 1
+                continue
+            seen.add((name, unit))
+            stats['unique'] += 1
+            yield name, unit
+
+    def batches(self, rows, batch_size):
+        return iter(lambda: list(islice(rows, batch_size)), [])
+
+    def bulk_insert(self, rows, batch_size):
+        for batch in self.batches(rows, batch_size):
+            Ingredient.objects.bulk_create(
+                [Ingredient(name=name, measurement_unit=unit)
+                 for name, unit in batch],
+                ignore_conflicts=True,
+            )
+
+    def copy_insert(self, rows, batch_size):
+        table = Ingredient._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'CREATE TEMP TABLE ingredient_import '
+                f'(name varchar({NAME_MAX_LENGTH}), '
+                f'measurement_unit varchar({UNIT_MAX_LENGTH})) '
+                'ON COMMIT DROP'
+            )
+            for batch in self.batches(rows, batch_size):
+                buffer = io.StringIO()
+                csv.writer(buffer).writerows(batch)
+                buffer.seek(0)
+                cursor.copy_expert(
+                    'COPY ingredient_import FROM STDIN WITH (FORMAT csv)',
+                    buffer
+                )
+            cursor.execute(
+                f'INSERT INTO {table} (name, measurement_unit) '
+                'SELECT name, measurement_unit FROM ingredient_import '
+                'ON CONFLICT DO NOTHING'
+            )
+
+    def handle(self, *args, **options):
+        path = Path(options['path'])
+        file_format = options['format'] or path.suffix.lstrip('.').lower()
+        if file_format not in ('csv', 'json'):
+            raise CommandError(
+                'Не удалось определить формат файла, укажите --format.'
+            )
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size должен быть больше нуля.')
+        self.verbosity = options['verbosity']
+        use_copy = (
+            connection.vendor == 'postgresql' and not options['no_copy']
+        )
+
+        stats = {'unique': 0, 'failed': 0, 'duplicates': 0}
+        rows = self.clean_rows(self.read_rows(path, file_format), stats)
+        with transaction.atomic():
+            count_before = Ingredient.objects.count()
+            if use_copy:
+                self.copy_insert(rows, options['batch_size'])
+            else:
+                self.bulk_insert(rows, options['batch_size'])
+            inserted = Ingredient.objects.count() - count_before
+            if inserted:
+                Version.objects.bump('ingredients')
 
-        print("Данные успешно загружены в модель.")
+        skipped = stats['unique'] - inserted + stats['duplicates']
+        self.stdout.write(self.style.SUCCESS(
+            f'Добавлено: {inserted}, '
+            f'пропущено: {skipped}, '
+            f'с ошибками: {stats["failed"]}.'
+        ))
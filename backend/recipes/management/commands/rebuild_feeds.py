@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes.feeds import rebuild, trim
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает или обрезает ленты подписок'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', type=int, action='append', dest='user_ids',
+            help='Пересобрать только для пользователя с этим id'
+        )
+        parser.add_argument(
+            '--trim', action='store_true',
+            help='Не пересобирать, а удалить записи сверх FEED_MAX_LENGTH; '
+                 'запускается периодически'
+        )
+
+    def handle(self, *args, **options):
+        if options['trim']:
+            with transaction.atomic():
+                trimmed = trim(options['user_ids'])
+            self.stdout.write(self.style.SUCCESS(
+                f'Удалено записей лент: {trimmed}.'
+            ))
+            return
+        with transaction.atomic():
+            rebuild(options['user_ids'])
+        self.stdout.write(self.style.SUCCESS('Ленты подписок пересобраны.'))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes.shopping_lists import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает суммы ингредиентов в списках покупок'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', type=int, action='append', dest='user_ids',
+            help='Пересобрать только для пользователя с этим id'
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            rebuild(options['user_ids'])
+        self.stdout.write(self.style.SUCCESS('Списки покупок пересобраны.'))
@@ -0,0 +1,17 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes.counters import recount
+from recipes.models import Favorite, Recipe, ShoppingCart, Version
+from users.models import Follow
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счётчики избранного, покупок, рецептов и подписок'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            recount(Recipe, get_user_model(), Favorite, ShoppingCart, Follow)
+            Version.objects.bump('recipes', 'users')
+        self.stdout.write(self.style.SUCCESS('Счётчики пересчитаны.'))
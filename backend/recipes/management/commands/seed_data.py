@@ -0,0 +1,223 @@
+import random
+from datetime import timedelta
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from recipes.models import (
+    Favorite,
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    ShoppingCart,
+    Tag,
+    Version,
+)
+from users.models import Follow
+
+User = get_user_model()
+
+DEFAULT_TAGS = (
+    ('Завтрак', 'breakfast'),
+    ('Обед', 'lunch'),
+    ('Ужин', 'dinner'),
+)
+DISHES = (
+    'суп', 'салат', 'пирог', 'рагу', 'омлет', 'плов', 'запеканка',
+    'каша', 'паста', 'котлеты', 'блины', 'жаркое', 'десерт', 'соус',
+)
+ADJECTIVES = (
+    'домашний', 'быстрый', 'сытный', 'лёгкий', 'праздничный',
+    'летний', 'пряный', 'бабушкин', 'острый', 'нежный',
+)
+
+
+def zipf_weights(count, exponent=1.0):
+    """Веса, при которых первые элементы выбираются намного чаще."""
+    return [1 / (rank + 1) ** exponent for rank in range(count)]
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    return iter(lambda: list(islice(iterator, size)), [])
+
+
+class Command(BaseCommand):
+    help = 'Заполняет базу синтетическими данными для нагрузочных тестов'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--recipes', type=int, default=10000)
+        parser.add_argument(
+            '--favorites', type=int, default=20,
+            help='Среднее число избранных рецептов на пользователя'
+        )
+        parser.add_argument(
+            '--carts', type=int, default=5,
+            help='Среднее число рецептов в покупках на пользователя'
+        )
+        parser.add_argument(
+            '--follows', type=int, default=10,
+            help='Среднее число подписок на пользователя'
+        )
+        parser.add_argument('--prefix', default='seed')
+        parser.add_argument('--password', default='seed-password')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def bulk_create(self, model, objects, **kwargs):
+        for batch in batched(objects, self.batch_size):
+            model.objects.bulk_create(batch, **kwargs)
+
+    def last_id(self, model):
+        return model.objects.aggregate(last_id=Max('id'))['last_id'] or 0
+
+    def get_tag_ids(self):
+        if not Tag.objects.exists():
+            Tag.objects.bulk_create(
+                [Tag(name=name, slug=slug) for name, slug in DEFAULT_TAGS]
+            )
+        return list(Tag.objects.values_list('id', flat=True))
+
+    def create_users(self, count, prefix, password):
+        start = User.objects.filter(username__startswith=prefix).count()
+        password = make_password(password)
+        names = [f'{prefix}_user_{index}'
+                 for index in range(start, start + count)]
+        last_id = self.last_id(User)
+        self.bulk_create(User, (
+            User(
+                username=name,
+                email=f'{name}@example.com',
+                first_name='Тест',
+                last_name=name,
+                password=password,
+            ) for name in names
+        ))
+        return list(User.objects.filter(
+            id__gt=last_id
+        ).values_list('id', flat=True))
+
+    def create_recipes(self, count, author_ids):
+        rng = self.rng
+        now = timezone.now()
+        authors = rng.choices(
+            author_ids, weights=zipf_weights(len(author_ids)), k=count
+        )
+        last_id = self.last_id(Recipe)
+        self.bulk_create(Recipe, (
+            Recipe(
+                author_id=author_id,
+                name=f'{rng.choice(ADJECTIVES)} {rng.choice(DISHES)}'.title(),
+                text='Описание рецепта для нагрузочного теста.',
+                cooking_time=rng.randint(5, 180),
+            ) for author_id in authors
+        ))
+        recipes = list(
+            Recipe.objects.filter(id__gt=last_id).only('id').order_by('id')
+        )
+        for recipe in recipes:
+            recipe.pub_date = now - timedelta(
+                seconds=rng.randint(0, 365 * 24 * 3600)
+            )
+        Recipe.objects.bulk_update(
+            recipes, ['pub_date'], batch_size=self.batch_size
+        )
+        return [recipe.id for recipe in recipes]
+
+    def recipe_ingredients(self, recipe_ids, ingredient_ids):
+        rng = self.rng
+        popular = ingredient_ids[:]
+        rng.shuffle(popular)
+        weights = zipf_weights(len(popular), 0.8)
+        for recipe_id in recipe_ids:
+            chosen = set(rng.choices(
+                popular, weights=weights, k=rng.randint(3, 15)
+            ))
+            for ingredient_id in chosen:
+                yield RecipeIngredient(
+                    recipe_id=recipe_id,
+                    ingredient_id=ingredient_id,
+                    amount=rng.randint(1, 500),
+                )
+
+    def recipe_tags(self, recipe_ids, tag_ids):
+        through = Recipe.tags.through
+        for recipe_id in recipe_ids:
+            for tag_id in self.rng.sample(
+                tag_ids, self.rng.randint(1, min(3, len(tag_ids)))
+            ):
+                yield through(recipe_id=recipe_id, tag_id=tag_id)
+
+    def user_links(self, user_ids, target_ids, average):
+        """Пары (пользователь, объект) с популярностью объектов по Ципфу."""
+        rng = self.rng
+        weights = zipf_weights(len(target_ids))
+        for user_id in user_ids:
+            count = min(rng.randint(0, 2 * average), len(target_ids))
+            for target_id in set(rng.choices(
+                target_ids, weights=weights, k=count
+            )):
+                yield user_id, target_id
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        ingredient_ids = list(Ingredient.objects.values_list('id', flat=True))
+        if not ingredient_ids:
+            raise CommandError(
+                'Нет ингредиентов: сначала выполните import_csv.'
+            )
+        if options['users'] < 1:
+            raise CommandError('--users должен быть больше нуля.')
+
+        with transaction.atomic():
+            tag_ids = self.get_tag_ids()
+            user_ids = self.create_users(
+                options['users'], options['prefix'], options['password']
+            )
+            recipe_ids = self.create_recipes(options['recipes'], user_ids)
+            self.bulk_create(
+                RecipeIngredient,
+                self.recipe_ingredients(recipe_ids, ingredient_ids)
+            )
+            self.bulk_create(
+                Recipe.tags.through, self.recipe_tags(recipe_ids, tag_ids)
+            )
+            self.bulk_create(Favorite, (
+                Favorite(user_id=user_id, recipe_id=recipe_id)
+                for user_id, recipe_id in self.user_links(
+                    user_ids, recipe_ids, options['favorites'])
+            ), ignore_conflicts=True)
+            self.bulk_create(ShoppingCart, (
+                ShoppingCart(user_id=user_id, recipe_id=recipe_id)
+                for user_id, recipe_id in self.user_links(
+                    user_ids, recipe_ids, options['carts'])
+            ), ignore_conflicts=True)
+            self.bulk_create(Follow, (
+                Follow(follower_id=follower_id, author_id=author_id)
+                for follower_id, author_id in self.user_links(
+                    user_ids, user_ids, options['follows'])
+                if follower_id != author_id
+            ), ignore_conflicts=True)
+            call_command('recount_counters', stdout=self.stdout)
+            call_command('rebuild_shopping_lists', stdout=self.stdout)
+            call_command('rebuild_feeds', stdout=self.stdout)
+            call_command('build_similar_recipes', stdout=self.stdout)
+            Version.objects.bump('recipes', 'tags', 'users')
+            for batch in batched(user_ids, 500):
+                Version.objects.bump(
+                    *(f'user:{user_id}' for user_id in batch)
+                )
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано пользователей: {len(user_ids)}, '
+            f'рецептов: {len(recipe_ids)}. '
+            f'Пароль пользователей: {options["password"]}.'
+        ))
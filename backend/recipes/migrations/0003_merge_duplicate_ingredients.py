@@ -0,0 +1,52 @@
+# Generated by Django 3.2.16 on 2026-10-18 03:27
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def merge_duplicate_ingredients(apps, schema_editor):
+    Ingredient = apps.get_model('recipes', 'Ingredient')
+    RecipeIngredient = apps.get_model('recipes', 'RecipeIngredient')
+    duplicates = Ingredient.objects.values(
+        'name', 'measurement_unit'
+    ).annotate(
+        keep_id=Min('id'), total=Count('id')
+    ).filter(total__gt=1)
+    for duplicate in duplicates:
+        keep_id = duplicate['keep_id']
+        extra_ids = Ingredient.objects.filter(
+            name=duplicate['name'],
+            measurement_unit=duplicate['measurement_unit'],
+        ).exclude(id=keep_id).values_list('id', flat=True)
+        for item in RecipeIngredient.objects.filter(
+            ingredient_id__in=list(extra_ids)
+        ):
+            kept = RecipeIngredient.objects.filter(
+                recipe_id=item.recipe_id, ingredient_id=keep_id
+            ).first()
+            if kept:
+                kept.amount += item.amount
+                kept.save(update_fields=['amount'])
+                item.delete()
+            else:
+                item.ingredient_id = keep_id
+                item.save(update_fields=['ingredient'])
+        Ingredient.objects.filter(id__in=list(extra_ids)).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='ingredient',
+            name='name',
+            field=models.CharField(max_length=50, verbose_name='Ингредиент'),
+        ),
+        migrations.RunPython(
+            merge_duplicate_ingredients, migrations.RunPython.noop
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 3.2.16 on 2026-10-18 03:27
+
+from django.db import migrations, models
+
+
+# Ограничение создаётся отдельно от слияния дублей в 0003: в одной
+# транзакции с изменением строк PostgreSQL не даёт менять таблицу
+# (pending trigger events).
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0003_merge_duplicate_ingredients'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='ingredient',
+            constraint=models.UniqueConstraint(fields=('name', 'measurement_unit'), name='unique_ingredient'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 3.2.16 on 2026-10-18 03:31
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0004_unique_ingredient'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Version',
+            fields=[
+                ('key', models.CharField(max_length=64, primary_key=True, serialize=False, verbose_name='Ключ')),
+                ('version', models.PositiveBigIntegerField(default=0, verbose_name='Версия')),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Изменено')),
+            ],
+            options={
+                'verbose_name': 'версия данных',
+                'verbose_name_plural': 'Версии данных',
+            },
+        ),
+    ]
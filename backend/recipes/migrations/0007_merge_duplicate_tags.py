@@ -0,0 +1,37 @@
+# Generated by Django 3.2.16 on 2026-10-18 03:32
+
+from django.db import migrations
+from django.db.models import Count, Min
+
+
+def merge_duplicate_tags(apps, schema_editor):
+    """Перед уникальностью слага в 0008 теги с одним слагом сливаются
+    в тег с меньшим id."""
+    Tag = apps.get_model('recipes', 'Tag')
+    RecipeTag = apps.get_model('recipes', 'Recipe').tags.through
+    duplicates = Tag.objects.values('slug').annotate(
+        keep_id=Min('id'), total=Count('id')
+    ).filter(total__gt=1)
+    for duplicate in duplicates:
+        keep_id = duplicate['keep_id']
+        extra_ids = list(Tag.objects.filter(
+            slug=duplicate['slug']
+        ).exclude(id=keep_id).values_list('id', flat=True))
+        for extra_id in extra_ids:
+            RecipeTag.objects.filter(tag_id=extra_id).exclude(
+                recipe_id__in=RecipeTag.objects.filter(
+                    tag_id=keep_id
+                ).values('recipe_id')
+            ).update(tag_id=keep_id)
+        Tag.objects.filter(id__in=extra_ids).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0006_recipe_pub_date'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_tags, migrations.RunPython.noop),
+    ]
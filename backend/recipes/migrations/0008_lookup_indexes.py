@@ -0,0 +1,46 @@
+# Generated by Django 3.2.16 on 2026-10-18 03:32
+
+from django.db import migrations, models
+
+# Индекс для istartswith/iexact по названию: Django сравнивает
+# UPPER("name"::text), поэтому индекс строится по тому же выражению.
+INGREDIENT_NAME_INDEX = 'ingredient_upper_name_idx'
+
+
+def create_ingredient_name_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {INGREDIENT_NAME_INDEX} '
+            'ON recipes_ingredient (UPPER(name::text) text_pattern_ops)'
+        )
+
+
+def drop_ingredient_name_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(f'DROP INDEX IF EXISTS {INGREDIENT_NAME_INDEX}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0007_merge_duplicate_tags'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='tag',
+            name='slug',
+            field=models.CharField(max_length=25, unique=True, verbose_name='Слаг'),
+        ),
+        migrations.AddIndex(
+            model_name='favorite',
+            index=models.Index(fields=['recipe', 'user'], name='favorite_recipe_user_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='shoppingcart',
+            index=models.Index(fields=['recipe', 'user'], name='cart_recipe_user_idx'),
+        ),
+        migrations.RunPython(
+            create_ingredient_name_index, drop_ingredient_name_index
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 3.2.16 on 2026-10-18 03:36
+
+from django.db import migrations, models
+
+from recipes.counters import recount
+
+
+def recount_counters(apps, schema_editor):
+    recount(
+        apps.get_model('recipes', 'Recipe'),
+        apps.get_model('users', 'User'),
+        apps.get_model('recipes', 'Favorite'),
+        apps.get_model('recipes', 'ShoppingCart'),
+        apps.get_model('users', 'Follow'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0008_lookup_indexes'),
+        ('users', '0003_user_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='favorites_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='В избранном'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='in_carts_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='В списках покупок'),
+        ),
+        migrations.RunPython(recount_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,45 @@
+from django.db import migrations
+
+# Поисковый вектор хранится в генерируемой колонке: PostgreSQL сам
+# пересчитывает его при любой записи, включая bulk_create и update().
+# Вне PostgreSQL колонки и индексов нет, поиск идёт через icontains.
+SEARCH_SQL = (
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    "ALTER TABLE recipes_recipe ADD COLUMN IF NOT EXISTS search_vector "
+    "tsvector GENERATED ALWAYS AS ("
+    "setweight(to_tsvector('russian'::regconfig, name), 'A') || "
+    "setweight(to_tsvector('russian'::regconfig, text), 'B')"
+    ") STORED",
+    'CREATE INDEX IF NOT EXISTS recipe_search_vector_idx '
+    'ON recipes_recipe USING gin (search_vector)',
+    'CREATE INDEX IF NOT EXISTS recipe_name_trgm_idx '
+    'ON recipes_recipe USING gin (name gin_trgm_ops)',
+)
+DROP_SEARCH_SQL = (
+    'DROP INDEX IF EXISTS recipe_name_trgm_idx',
+    'DROP INDEX IF EXISTS recipe_search_vector_idx',
+    'ALTER TABLE recipes_recipe DROP COLUMN IF EXISTS search_vector',
+)
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        for sql in SEARCH_SQL:
+            schema_editor.execute(sql)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        for sql in DROP_SEARCH_SQL:
+            schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0009_recipe_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
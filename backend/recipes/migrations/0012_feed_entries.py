@@ -0,0 +1,55 @@
+# Generated by Django 3.2.16 on 2026-10-18 04:03
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_feeds(apps, schema_editor):
+    schema_editor.execute(
+        'INSERT INTO recipes_feedentry (user_id, recipe_id, pub_date) '
+        'SELECT user_id, recipe_id, pub_date FROM ('
+        'SELECT follow.follower_id AS user_id, recipe.id AS recipe_id, '
+        'recipe.pub_date, ROW_NUMBER() OVER ('
+        'PARTITION BY follow.follower_id '
+        'ORDER BY recipe.pub_date DESC, recipe.id DESC'
+        ') AS position FROM users_follow follow '
+        'JOIN users_user author ON author.id = follow.author_id '
+        'JOIN recipes_recipe recipe ON recipe.author_id = follow.author_id '
+        'WHERE author.followers_count <= %s'
+        ') AS ranked WHERE position <= %s',
+        (settings.FEED_FANOUT_MAX_FOLLOWERS, settings.FEED_MAX_LENGTH)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recipes', '0011_shopping_list_items'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pub_date', models.DateTimeField(verbose_name='Дата публикации')),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='recipes.recipe', verbose_name='Рецепт')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_entries', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'запись ленты',
+                'verbose_name_plural': 'Ленты подписок',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='feedentry',
+            index=models.Index(fields=['user', '-pub_date', '-recipe'], name='feed_user_pub_date_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='feedentry',
+            constraint=models.UniqueConstraint(fields=('user', 'recipe'), name='unique_feed_entry'),
+        ),
+        migrations.RunPython(fill_feeds, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,25 @@
 from django.contrib.auth import get_user_model
 from django.core.validators import MinValueValidator
 from django.db import models
+from django.db import connections
+from django.db.models import (
+    BooleanField,
+    Case,
+    Exists,
+    F,
+    FloatField,
+    OuterRef,
+    Prefetch,
+    Q,
+    Value,
+    When,
+    Window,
+)
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import RowNumber
+from django.utils import timezone
+
+from users.models import CountersMixin, Follow
 
 User = get_user_model()
 
@@ -13,6 +32,12 @@ class Ingredient(models.Model):
     class Meta:
         verbose_name = 'ингредиент'
         verbose_name_plural = 'Ингредиенты'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['name', 'measurement_unit'],
+                name='unique_ingredient'
+            )
+        ]
 
     def __str__(self):
         return self.name
@@ -21,7 +46,7 @@ class Ingredient(models.Model):
 class Tag(models.Model):
 
     name = models.CharField('Тег', max_length=25)
-    slug = models.CharField('Слаг', max_length=25)
+    slug = models.CharField('Слаг', max_length=25, unique=True)
 
     class Meta:
         verbose_name = 'тег'
@@ -31,7 +56,102 @@ class Tag(models.Model):
         return self.name
 
 
-class Recipe(models.Model):
+def before_position(pub_date, pk, date_field='pub_date', id_field='id'):
+    """Условие «раньше (pub_date, pk)» в порядке -pub_date, -id.
+
+    Лишнее условие pub_date <= ... даёт планировщику границу диапазона
+    по индексу: без него OR из двух условий читает индекс с начала.
+    """
+    return Q(**{f'{date_field}__lte': pub_date}) & (
+        Q(**{f'{date_field}__lt': pub_date})
+        | Q(**{date_field: pub_date, f'{id_field}__lt': pk})
+    )
+
+
+class RecipeQuerySet(models.QuerySet):
+
+    def for_user(self, user):
+        """Подгружает автора, теги и ингредиенты фиксированным числом
+        запросов и аннотирует is_favorited, is_in_shopping_cart и
+        author.is_subscribed для пользователя."""
+        if user.is_authenticated:
+            is_favorited = Exists(Favorite.objects.filter(
+                user=user, recipe=OuterRef('pk')))
+            is_in_shopping_cart = Exists(ShoppingCart.objects.filter(
+                user=user, recipe=OuterRef('pk')))
+            is_subscribed = Exists(Follow.objects.filter(
+                follower=user, author=OuterRef('pk')))
+        else:
+            is_favorited = is_in_shopping_cart = is_subscribed = Value(
+                False, output_field=BooleanField())
+        return self.annotate(
+            is_favorited=is_favorited,
+            is_in_shopping_cart=is_in_shopping_cart,
+        ).prefetch_related(
+            Prefetch('author', queryset=User.objects.annotate(
+                is_subscribed=is_subscribed)),
+            'tags',
+            Prefetch(
+                'recipe_ingredient',
+                queryset=RecipeIngredient.objects.select_related('ingredient')
+            ),
+        )
+
+    def search(self, query):
+        """Рецепты, подходящие под поисковую строку, по убыванию ранга.
+
+        На PostgreSQL — полнотекстовый поиск по search_vector (название
+        важнее описания) и нечёткое совпадение названия по триграммам для
+        опечаток; оба условия обслуживаются GIN-индексами. На других СУБД
+        каждое слово ищется в названии или описании через icontains.
+        """
+        if connections[self.db].vendor != 'postgresql':
+            matches = Q()
+            for word in query.split():
+                matches &= Q(name__icontains=word) | Q(text__icontains=word)
+            rank = Case(
+                When(name__icontains=query, then=Value(1.0)),
+                default=Value(0.0),
+                output_field=FloatField(),
+            )
+            return self.filter(matches).annotate(rank=rank).order_by(
+                '-rank', '-pub_date', '-id'
+            )
+
+        table = self.model._meta.db_table
+        ts_query = "websearch_to_tsquery('russian'::regconfig, %s)"
+        matches = RawSQL(
+            f'{table}.search_vector @@ {ts_query}', (query,),
+            output_field=BooleanField()
+        )
+        similar = RawSQL(
+            f'{table}.name %% %s', (query,), output_field=BooleanField()
+        )
+        rank = RawSQL(
+            f'ts_rank({table}.search_vector, {ts_query}) '
+            f'+ similarity({table}.name, %s)', (query, query),
+            output_field=FloatField()
+        )
+        return self.filter(Q(matches) | Q(similar)).annotate(
+            rank=rank
+        ).order_by('-rank', '-pub_date', '-id')
+
+    def first_per_author(self, limit):
+        """Первые limit рецептов каждого автора одним оконным запросом."""
+        ranked = self.annotate(author_rank=Window(
+            RowNumber(),
+            partition_by=F('author'),
+            order_by=[F('pub_date').desc(), F('id').desc()],
+        ))
+        sql, params = ranked.query.sql_with_params()
+        return self.model.objects.raw(
+            f'SELECT * FROM ({sql}) AS ranked WHERE author_rank <= %s '
+            'ORDER BY author_rank',
+            (*params, limit)
+        )
+
+
+class Recipe(CountersMixin, models.Model):
 
     ingredients = models.ManyToManyField(
         Ingredient,
@@ -61,10 +181,27 @@ class Recipe(models.Model):
         'Время приготовления',
         validators=[MinValueValidator(1)],
     )
+    pub_date = models.DateTimeField('Дата публикации', auto_now_add=True)
+    favorites_count = models.PositiveIntegerField(
+        'В избранном', default=0, editable=False
+    )
+    in_carts_count = models.PositiveIntegerField(
+        'В списках покупок', default=0, editable=False
+    )
+
+    counter_fields = ('favorites_count', 'in_carts_count')
+
+    objects = RecipeQuerySet.as_manager()
 
     class Meta:
+        ordering = ('-pub_date', '-id')
         verbose_name = 'рецепт'
         verbose_name_plural = 'Рецепты'
+        indexes = [
+            models.Index(
+                fields=['-pub_date', '-id'], name='recipe_pub_date_id_idx'
+            )
+        ]
 
     def __str__(self):
         return self.name
@@ -120,6 +257,11 @@ class Favorite(models.Model):
     class Meta:
         verbose_name = 'избранный рецепт'
         verbose_name_plural = 'Избранные рецепты'
+        indexes = [
+            models.Index(
+                fields=['recipe', 'user'], name='favorite_recipe_user_idx'
+            )
+        ]
 
         constraints = [
             models.UniqueConstraint(
@@ -149,6 +291,11 @@ class ShoppingCart(models.Model):
     class Meta:
         verbose_name = 'список покупок'
         verbose_name_plural = 'Списки покупок'
+        indexes = [
+            models.Index(
+                fields=['recipe', 'user'], name='cart_recipe_user_idx'
+            )
+        ]
 
         constraints = [
             models.UniqueConstraint(
@@ -156,3 +303,163 @@ class ShoppingCart(models.Model):
                 name='unique_user_recipe_shopping_cart'
             )
         ]
+
+
+class ShoppingListItem(models.Model):
+    """Сумма ингредиента по всем рецептам в списке покупок пользователя.
+
+    Обновляется по разнице при изменении списка покупок и ингредиентов
+    рецептов (recipes.shopping_lists), пересобирается командой
+    rebuild_shopping_lists.
+    """
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='shopping_list_items',
+        verbose_name='Пользователь'
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Ингредиент'
+    )
+    amount = models.IntegerField('Количество')
+
+    class Meta:
+        verbose_name = 'позиция списка покупок'
+        verbose_name_plural = 'Позиции списков покупок'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'ingredient'],
+                name='unique_shopping_list_item'
+            )
+        ]
+
+
+class FeedEntry(models.Model):
+    """Рецепт в ленте подписок пользователя.
+
+    Записывается при публикации рецепта всем подписчикам автора
+    (recipes.feeds); дата публикации копируется для выборки по индексу.
+    """
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        verbose_name='Пользователь'
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Рецепт'
+    )
+    pub_date = models.DateTimeField('Дата публикации')
+
+    class Meta:
+        verbose_name = 'запись ленты'
+        verbose_name_plural = 'Ленты подписок'
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-recipe'],
+                name='feed_user_pub_date_idx'
+            )
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'recipe'],
+                name='unique_feed_entry'
+            )
+        ]
+
+
+class SimilarRecipe(models.Model):
+    """Рецепт, похожий на данный по набору ингредиентов.
+
+    Для каждого рецепта хранится SIMILAR_RECIPES_COUNT лучших соседей;
+    таблицу заполняет команда build_similar_recipes (recipes.similarity).
+    """
+
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='similar_recipes',
+        verbose_name='Рецепт'
+    )
+    similar = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='similar_to',
+        verbose_name='Похожий рецепт'
+    )
+    score = models.FloatField('Сходство')
+
+    class Meta:
+        verbose_name = 'похожий рецепт'
+        verbose_name_plural = 'Похожие рецепты'
+        indexes = [
+            models.Index(
+                fields=['recipe', '-score'],
+                name='similar_recipe_score_idx'
+            )
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['recipe', 'similar'],
+                name='unique_similar_recipe'
+            )
+        ]
+
+
+class SimilarityUpdate(models.Model):
+    """Рецепт, соседей которого нужно пересчитать."""
+
+    recipe = models.OneToOneField(
+        Recipe,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='+',
+        verbose_name='Рецепт'
+    )
+
+    class Meta:
+        verbose_name = 'пересчёт похожих рецептов'
+        verbose_name_plural = 'Пересчёт похожих рецептов'
+
+
+class VersionManager(models.Manager):
+
+    def bump(self, *keys):
+        """Увеличивает версии ключей, создавая отсутствующие."""
+        updated = self.filter(key__in=keys).update(
+            version=F('version') + 1, updated_at=timezone.now()
+        )
+        if updated < len(keys):
+            self.bulk_create(
+                [self.model(key=key, version=1) for key in keys],
+                ignore_conflicts=True
+            )
+
+
+class Version(models.Model):
+    """Счётчик изменений данных для условных запросов.
+
+    Ключи: recipes, tags, ingredients, users и user:<id> для данных,
+    видимых только пользователю (избранное, покупки, подписки).
+    """
+
+    key = models.CharField('Ключ', max_length=64, primary_key=True)
+    version = models.PositiveBigIntegerField('Версия', default=0)
+    updated_at = models.DateTimeField('Изменено', default=timezone.now)
+
+    objects = VersionManager()
+
+    class Meta:
+        verbose_name = 'версия данных'
+        verbose_name_plural = 'Версии данных'
+
+    def __str__(self):
+        return f'{self.key} {self.version}'
@@ -0,0 +1,96 @@
+from django.db import connection
+
+from recipes.models import (
+    RecipeIngredient,
+    ShoppingCart,
+    ShoppingListItem,
+)
+
+ITEMS = ShoppingListItem._meta.db_table
+CART = ShoppingCart._meta.db_table
+RECIPE_INGREDIENTS = RecipeIngredient._meta.db_table
+
+# Прибавляет к суммам строки (user_id, ingredient_id, amount) из SELECT.
+UPSERT = (
+    f'INSERT INTO {ITEMS} (user_id, ingredient_id, amount) {{select}} '
+    'ON CONFLICT (user_id, ingredient_id) '
+    f'DO UPDATE SET amount = {ITEMS}.amount + excluded.amount'
+)
+
+
+def add_recipe(user_id, recipe_id, sign=1):
+    """Прибавляет ингредиенты рецепта к списку покупок пользователя.
+
+    С sign=-1 вычитает их; позиции с нулевой суммой удаляются.
+    """
+    add_recipes(user_id, [recipe_id], sign)
+
+
+def add_recipes(user_id, recipe_ids, sign=1):
+    """То же для нескольких рецептов одним запросом."""
+    recipe_ids = list(recipe_ids)
+    if not recipe_ids:
+        return
+    placeholders = ', '.join(['%s'] * len(recipe_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(UPSERT.format(select=(
+            'SELECT %s, ingredient_id, SUM(amount) * %s '
+            f'FROM {RECIPE_INGREDIENTS} WHERE recipe_id IN ({placeholders}) '
+            'GROUP BY ingredient_id'
+        )), (user_id, sign, *recipe_ids))
+    if sign < 0:
+        ShoppingListItem.objects.filter(
+            user_id=user_id, amount__lte=0
+        ).delete()
+
+
+def change_ingredients(recipe_id, deltas):
+    """Меняет суммы у всех, у кого рецепт в покупках.
+
+    deltas — изменение количества по id ингредиента.
+    """
+    deltas = {
+        ingredient_id: delta
+        for ingredient_id, delta in deltas.items() if delta
+    }
+    if not deltas:
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(UPSERT.format(select=(
+            f'SELECT user_id, %s, %s FROM {CART} WHERE recipe_id = %s'
+        )), [
+            (ingredient_id, delta, recipe_id)
+            for ingredient_id, delta in deltas.items()
+        ])
+    decreased = [
+        ingredient_id for ingredient_id, delta in deltas.items() if delta < 0
+    ]
+    if decreased:
+        ShoppingListItem.objects.filter(
+            ingredient_id__in=decreased, amount__lte=0
+        ).delete()
+
+
+def rebuild(user_ids=None):
+    """Пересобирает списки покупок из корзин: всех или user_ids."""
+    items = ShoppingListItem.objects.all()
+    where, params = '', ()
+    if user_ids is not None:
+        user_ids = list(user_ids)
+        if not user_ids:
+            return
+        items = items.filter(user_id__in=user_ids)
+        where = 'WHERE cart.user_id IN ({})'.format(
+            ', '.join(['%s'] * len(user_ids))
+        )
+        params = user_ids
+    items.delete()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {ITEMS} (user_id, ingredient_id, amount) '
+            'SELECT cart.user_id, item.ingredient_id, SUM(item.amount) '
+            f'FROM {CART} cart JOIN {RECIPE_INGREDIENTS} item '
+            f'ON item.recipe_id = cart.recipe_id {where} '
+            'GROUP BY cart.user_id, item.ingredient_id',
+            params
+        )
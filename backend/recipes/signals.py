@@ -0,0 +1,158 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import (
+    post_delete,
+    post_save,
+    pre_delete,
+    pre_save,
+)
+from django.dispatch import receiver
+
+from recipes import feeds, shopping_lists, similarity
+from recipes.counters import change_counter
+from recipes.models import (
+    Favorite,
+    Recipe,
+    RecipeIngredient,
+    ShoppingCart,
+    SimilarRecipe,
+)
+from users.models import Follow
+
+User = get_user_model()
+
+# Счётчики, которые меняются при создании и удалении строк модели:
+# (модель счётчика, атрибут с её id, поле счётчика).
+COUNTERS = {
+    Favorite: ((Recipe, 'recipe_id', 'favorites_count'),),
+    ShoppingCart: ((Recipe, 'recipe_id', 'in_carts_count'),),
+    Recipe: ((User, 'author_id', 'recipes_count'),),
+    Follow: (
+        (User, 'author_id', 'followers_count'),
+        (User, 'follower_id', 'following_count'),
+    ),
+}
+
+
+def update_counters(instance, delta):
+    for model, attribute, field in COUNTERS[type(instance)]:
+        change_counter(model, getattr(instance, attribute), field, delta)
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=Follow)
+def increment_counters(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        update_counters(instance, 1)
+
+
+@receiver(post_delete, sender=Favorite)
+@receiver(post_delete, sender=ShoppingCart)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=Follow)
+def decrement_counters(sender, instance, **kwargs):
+    update_counters(instance, -1)
+
+
+# Суммы списков покупок меняются и при изменении корзины, и при изменении
+# ингредиентов рецепта. При каскадном удалении рецепта вклад каждой пары
+# (корзина, ингредиент) вычитается один раз: тем обработчиком, чья строка
+# удаляется первой, пока вторая ещё существует.
+
+@receiver(post_save, sender=ShoppingCart)
+def add_to_shopping_list(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        shopping_lists.add_recipe(instance.user_id, instance.recipe_id)
+
+
+@receiver(post_delete, sender=ShoppingCart)
+def remove_from_shopping_list(sender, instance, **kwargs):
+    shopping_lists.add_recipe(instance.user_id, instance.recipe_id, -1)
+
+
+@receiver(pre_save, sender=RecipeIngredient)
+def remember_recipe_ingredient(sender, instance, raw=False, **kwargs):
+    instance.saved_state = None
+    if instance.pk and not raw:
+        instance.saved_state = RecipeIngredient.objects.filter(
+            pk=instance.pk
+        ).values_list('ingredient_id', 'amount').first()
+
+
+@receiver(post_save, sender=RecipeIngredient)
+def update_shopping_lists(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    deltas = {}
+    if getattr(instance, 'saved_state', None):
+        ingredient_id, amount = instance.saved_state
+        deltas[ingredient_id] = -amount
+    deltas[instance.ingredient_id] = (
+        deltas.get(instance.ingredient_id, 0) + instance.amount
+    )
+    shopping_lists.change_ingredients(instance.recipe_id, deltas)
+
+
+@receiver(post_delete, sender=RecipeIngredient)
+def subtract_from_shopping_lists(sender, instance, **kwargs):
+    shopping_lists.change_ingredients(
+        instance.recipe_id, {instance.ingredient_id: -instance.amount}
+    )
+
+
+@receiver(post_save, sender=Recipe)
+def fan_out_recipe(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        feeds.fan_out(instance)
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def rebuild_follower_feed(sender, instance, raw=False, **kwargs):
+    """Лента собирается после фиксации: при удалении пользователя его
+    подписки к этому моменту уже удалены, и собирать будет нечего."""
+    if not raw:
+        follower_id = instance.follower_id
+        transaction.on_commit(lambda: feeds.rebuild([follower_id]))
+
+
+@receiver(post_delete, sender=Follow)
+def backfill_author_feeds(sender, instance, **kwargs):
+    """Автор, у которого подписчиков снова не больше порога, рассылается
+    в ленты: его прежние рецепты туда нужно дописать."""
+    author_id = instance.author_id
+
+    def backfill():
+        if User.objects.filter(
+            pk=author_id, followers_count=settings.FEED_FANOUT_MAX_FOLLOWERS
+        ).exists():
+            feeds.backfill(author_id)
+
+    transaction.on_commit(backfill)
+
+
+# Сходство зависит только от набора ингредиентов рецепта.
+
+@receiver(post_save, sender=RecipeIngredient)
+def mark_similarity_on_save(sender, instance, created, raw=False, **kwargs):
+    saved_state = getattr(instance, 'saved_state', None)
+    if not raw and (
+        created or saved_state and saved_state[0] != instance.ingredient_id
+    ):
+        similarity.mark_changed([instance.recipe_id])
+
+
+@receiver(post_delete, sender=RecipeIngredient)
+def mark_similarity_on_delete(sender, instance, **kwargs):
+    similarity.mark_changed([instance.recipe_id])
+
+
+@receiver(pre_delete, sender=Recipe)
+def mark_similar_recipes(sender, instance, **kwargs):
+    """Списки соседей, из которых пропадёт удаляемый рецепт."""
+    similarity.mark_changed(SimilarRecipe.objects.filter(
+        similar=instance
+    ).values_list('recipe_id', flat=True))
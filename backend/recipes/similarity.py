@@ -0,0 +1,219 @@
+import math
+from collections import Counter, defaultdict
+from heapq import nlargest
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Min
+
+from recipes.models import (
+    Recipe,
+    RecipeIngredient,
+    SimilarRecipe,
+    SimilarityUpdate,
+)
+
+try:
+    import numpy
+    from scipy import sparse
+except ImportError:
+    numpy = sparse = None
+
+# Сходство рецептов — косинус между наборами ингредиентов с весами IDF:
+# общий редкий ингредиент значит больше, чем общая соль.
+
+
+def load_vectors():
+    """Нормированные веса ингредиентов каждого рецепта."""
+    recipes = defaultdict(set)
+    for recipe_id, ingredient_id in RecipeIngredient.objects.values_list(
+        'recipe_id', 'ingredient_id'
+    ).iterator():
+        recipes[recipe_id].add(ingredient_id)
+    frequencies = Counter(
+        ingredient_id
+        for ingredient_ids in recipes.values()
+        for ingredient_id in ingredient_ids
+    )
+    weights = {
+        ingredient_id: math.log(1 + len(recipes) / frequency)
+        for ingredient_id, frequency in frequencies.items()
+    }
+    vectors = {}
+    for recipe_id, ingredient_ids in recipes.items():
+        norm = math.sqrt(sum(weights[pk] ** 2 for pk in ingredient_ids))
+        vectors[recipe_id] = {
+            pk: weights[pk] / norm for pk in ingredient_ids
+        }
+    return vectors
+
+
+class PostingsIndex:
+    """Поиск соседей по спискам рецептов каждого ингредиента.
+
+    Используется, если не установлены NumPy и SciPy.
+    """
+
+    def __init__(self, vectors):
+        self.vectors = vectors
+        self.postings = defaultdict(list)
+        for recipe_id, weights in vectors.items():
+            for ingredient_id, weight in weights.items():
+                self.postings[ingredient_id].append((recipe_id, weight))
+
+    def similarities(self, recipe_id):
+        """Ненулевое сходство рецепта со всеми остальными."""
+        scores = defaultdict(float)
+        for ingredient_id, weight in self.vectors.get(recipe_id, {}).items():
+            for other_id, other_weight in self.postings[ingredient_id]:
+                scores[other_id] += weight * other_weight
+        scores.pop(recipe_id, None)
+        return scores
+
+    def neighbours(self, recipe_ids, count):
+        for recipe_id in recipe_ids:
+            yield recipe_id, nlargest(
+                count, self.similarities(recipe_id).items(),
+                key=lambda item: (item[1], -item[0])
+            )
+
+
+class MatrixIndex:
+    """Поиск соседей умножением разреженной матрицы рецепт×ингредиент
+    на себя блоками строк."""
+
+    max_cells = 4 * 1024 * 1024
+
+    def __init__(self, vectors):
+        self.ids = numpy.fromiter(vectors, dtype=numpy.int64)
+        self.rows = {recipe_id: row for row, recipe_id in enumerate(vectors)}
+        columns = {}
+        data, indices, indptr = [], [], [0]
+        for weights in vectors.values():
+            for ingredient_id, weight in weights.items():
+                indices.append(columns.setdefault(ingredient_id, len(columns)))
+                data.append(weight)
+            indptr.append(len(indices))
+        self.matrix = sparse.csr_matrix(
+            (data, indices, indptr),
+            shape=(len(self.ids), len(columns)),
+            dtype=numpy.float32,
+        )
+        self.transposed = self.matrix.T.tocsr()
+
+    def products(self, recipe_ids):
+        """Сходство рецептов со всеми, кроме самих себя: для каждого
+        рецепта номера столбцов и значения строки разреженного произведения.
+
+        Строк в одном произведении не больше max_cells / N: с общим
+        ингредиентом вроде соли строка заполнена почти целиком.
+        """
+        step = max(1, self.max_cells // max(len(self.ids), 1))
+        for block in batched(recipe_ids, step):
+            rows = [self.rows[recipe_id] for recipe_id in block]
+            product = (self.matrix[rows] @ self.transposed).tocsr()
+            bounds = zip(product.indptr, product.indptr[1:])
+            for recipe_id, row, (start, end) in zip(block, rows, bounds):
+                columns = product.indices[start:end]
+                scores = product.data[start:end]
+                other = columns != row
+                yield recipe_id, columns[other], scores[other]
+
+    def similarities(self, recipe_id):
+        if recipe_id not in self.rows:
+            return {}
+        for _, columns, scores in self.products([recipe_id]):
+            return dict(zip(self.ids[columns].tolist(), scores.tolist()))
+
+    def neighbours(self, recipe_ids, count):
+        known = [pk for pk in recipe_ids if pk in self.rows]
+        yield from ((pk, []) for pk in recipe_ids if pk not in self.rows)
+        for recipe_id, columns, scores in self.products(known):
+            similar_ids = self.ids[columns]
+            # По убыванию сходства, при равенстве — по возрастанию id.
+            order = numpy.lexsort((similar_ids, -scores))[:count]
+            yield recipe_id, list(zip(
+                similar_ids[order].tolist(), scores[order].tolist()
+            ))
+
+
+def get_index(vectors):
+    if sparse is None:
+        return PostingsIndex(vectors)
+    return MatrixIndex(vectors)
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    return iter(lambda: list(islice(iterator, size)), [])
+
+
+def store(index, recipe_ids, block_size):
+    """Пересчитывает и сохраняет соседей рецептов блоками."""
+    count = settings.SIMILAR_RECIPES_COUNT
+    for block in batched(recipe_ids, block_size):
+        rows = [
+            SimilarRecipe(recipe_id=recipe_id, similar_id=similar_id,
+                          score=score)
+            for recipe_id, neighbours in index.neighbours(block, count)
+            for similar_id, score in neighbours
+        ]
+        with transaction.atomic():
+            SimilarRecipe.objects.filter(recipe_id__in=block).delete()
+            SimilarRecipe.objects.bulk_create(rows)
+
+
+def rebuild(block_size=500):
+    """Пересчитывает соседей всех рецептов."""
+    pending = list(SimilarityUpdate.objects.values_list('pk', flat=True))
+    recipe_ids = list(Recipe.objects.values_list('id', flat=True))
+    store(get_index(load_vectors()), recipe_ids, block_size)
+    SimilarRecipe.objects.exclude(recipe_id__in=recipe_ids).delete()
+    SimilarityUpdate.objects.filter(pk__in=pending).delete()
+    return len(recipe_ids)
+
+
+def update(block_size=500):
+    """Пересчитывает соседей рецептов из очереди и тех рецептов, чьи
+    списки соседей от них зависят: рецепт уже в списке или теперь
+    похож сильнее худшего из соседей."""
+    pending = list(SimilarityUpdate.objects.values_list('pk', flat=True))
+    if not pending:
+        return 0
+    count = settings.SIMILAR_RECIPES_COUNT
+    index = get_index(load_vectors())
+    affected = set(pending)
+    affected.update(SimilarRecipe.objects.filter(
+        similar_id__in=pending
+    ).values_list('recipe_id', flat=True))
+    lowest = {
+        recipe_id: (score, total)
+        for recipe_id, score, total in SimilarRecipe.objects.values(
+            'recipe_id'
+        ).annotate(
+            score=Min('score'), total=Count('id')
+        ).values_list('recipe_id', 'score', 'total')
+    }
+    for recipe_id in pending:
+        for other_id, score in index.similarities(recipe_id).items():
+            worst, total = lowest.get(other_id, (0, 0))
+            if total < count or score > worst:
+                affected.add(other_id)
+    store(index, sorted(affected), block_size)
+    SimilarityUpdate.objects.filter(pk__in=pending).delete()
+    return len(affected)
+
+
+def mark_changed(recipe_ids):
+    """После фиксации ставит рецепты в очередь пересчёта соседей."""
+    recipe_ids = list(recipe_ids)
+    transaction.on_commit(lambda: SimilarityUpdate.objects.bulk_create(
+        [
+            SimilarityUpdate(recipe_id=recipe_id)
+            for recipe_id in Recipe.objects.filter(
+                id__in=recipe_ids
+            ).values_list('id', flat=True)
+        ],
+        ignore_conflicts=True
+    ))
@@ -0,0 +1,49 @@
+from django.db import connection
+
+from recipes import shopping_lists
+from recipes.counters import change_counters
+from recipes.models import Favorite, Recipe, ShoppingCart
+
+# Поле счётчика рецепта для каждого пользовательского списка.
+COUNTERS = {
+    Favorite: 'favorites_count',
+    ShoppingCart: 'in_carts_count',
+}
+
+
+def change_many(model, user_id, recipe_ids, sign):
+    """Добавляет (sign=1) или удаляет (sign=-1) рецепты из списка
+    пользователя одним запросом.
+
+    Сигналы при этом не срабатывают, поэтому счётчики рецептов и список
+    покупок обновляются здесь, только для действительно изменённых строк.
+    Возвращает id этих рецептов.
+    """
+    recipe_ids = list(recipe_ids)
+    if not recipe_ids:
+        return []
+    table = model._meta.db_table
+    if sign > 0:
+        sql = (
+            f'INSERT INTO {table} (user_id, recipe_id) VALUES '
+            + ', '.join(['(%s, %s)'] * len(recipe_ids))
+            + ' ON CONFLICT DO NOTHING RETURNING recipe_id'
+        )
+        params = [
+            value for recipe_id in recipe_ids for value in (user_id, recipe_id)
+        ]
+    else:
+        sql = (
+            f'DELETE FROM {table} WHERE user_id = %s AND recipe_id IN ('
+            + ', '.join(['%s'] * len(recipe_ids))
+            + ') RETURNING recipe_id'
+        )
+        params = [user_id, *recipe_ids]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        changed = [recipe_id for recipe_id, in cursor.fetchall()]
+    if changed:
+        change_counters(Recipe, changed, COUNTERS[model], sign)
+        if model is ShoppingCart:
+            shopping_lists.add_recipes(user_id, changed, sign)
+    return changed
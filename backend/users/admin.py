@@ -1,6 +1,30 @@
 from django.contrib import admin
 
+from recipes.admin_actions import export_csv
 from .models import User, Follow
 
-admin.site.register(User)
-admin.site.register(Follow)
+
+@admin.register(User)
+class UserAdmin(admin.ModelAdmin):
+    list_display = (
+        'username', 'email', 'first_name', 'last_name',
+        'recipes_count', 'followers_count'
+    )
+    # Поиск по началу имени и почты использует индексы по UPPER(...).
+    search_fields = ('^username', '^email')
+    ordering = ('username',)
+    readonly_fields = ('recipes_count', 'followers_count', 'following_count')
+    show_full_result_count = False
+    actions = (export_csv(
+        'id', 'username', 'email', 'first_name', 'last_name',
+        'recipes_count', 'followers_count', 'following_count'
+    ),)
+
+
+@admin.register(Follow)
+class FollowAdmin(admin.ModelAdmin):
+    list_display = ('follower', 'author')
+    list_select_related = ('follower', 'author')
+    autocomplete_fields = ('follower', 'author')
+    show_full_result_count = False
+    actions = (export_csv('follower__username', 'author__username'),)
@@ -0,0 +1,17 @@
+# Generated by Django 3.2.16 on 2026-10-18 03:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='follow',
+            index=models.Index(fields=['author', 'follower'], name='follow_author_follower_idx'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+from django.db import migrations
+
+# Индексы для поиска в админке по началу имени и почты: Django сравнивает
+# UPPER("поле"::text), поэтому индексы строятся по тому же выражению.
+USER_SEARCH_INDEXES = {
+    'user_upper_username_idx': 'username',
+    'user_upper_email_idx': 'email',
+}
+
+
+def create_user_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        for name, column in USER_SEARCH_INDEXES.items():
+            schema_editor.execute(
+                f'CREATE INDEX IF NOT EXISTS {name} '
+                f'ON users_user (UPPER({column}::text) text_pattern_ops)'
+            )
+
+
+def drop_user_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        for name in USER_SEARCH_INDEXES:
+            schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_user_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            create_user_search_indexes, drop_user_search_indexes
+        ),
+    ]
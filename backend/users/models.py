@@ -3,7 +3,31 @@ from django.core.validators import RegexValidator
 from django.db import models
 
 
-class User(AbstractUser):
+class CountersMixin:
+    """Модель со счётчиками, которые меняются только запросами UPDATE
+    с F() (recipes.counters).
+
+    Полное сохранение существующей строки их не записывает: иначе
+    устаревшее значение из памяти затёрло бы параллельные изменения.
+    """
+
+    counter_fields = ()
+
+    def save(self, *args, update_fields=None, **kwargs):
+        if (
+            update_fields is None
+            and not self._state.adding
+            and not kwargs.get('force_insert')
+        ):
+            update_fields = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.counter_fields
+            ]
+        super().save(*args, update_fields=update_fields, **kwargs)
+
+
+class User(CountersMixin, AbstractUser):
 
     email = models.EmailField(
         max_length=254,
@@ -22,6 +46,17 @@ class User(AbstractUser):
         null=True,
         default=None
     )
+    recipes_count = models.PositiveIntegerField(
+        'Рецептов', default=0, editable=False
+    )
+    followers_count = models.PositiveIntegerField(
+        'Подписчиков', default=0, editable=False
+    )
+    following_count = models.PositiveIntegerField(
+        'Подписок', default=0, editable=False
+    )
+
+    counter_fields = ('recipes_count', 'followers_count', 'following_count')
 
     USERNAME_FIELD = "email"
     REQUIRED_FIELDS = ["username", "first_name", "last_name", "password", ]
@@ -55,6 +90,12 @@ class Follow(models.Model):
     class Meta:
         verbose_name = 'подписка'
         verbose_name_plural = 'Подписки'
+        indexes = [
+            models.Index(
+                fields=['author', 'follower'],
+                name='follow_author_follower_idx'
+            )
+        ]
         constraints = [
             models.UniqueConstraint(
                 fields=['follower', 'author'],